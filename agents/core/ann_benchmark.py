@@ -0,0 +1,115 @@
+"""Recall@k vs. latency report for the AdaptiveIndex operating points.
+
+Usage:
+    python -m agents.core.ann_benchmark --n 200000 --dim 384 --k 10 --out docs/ann_benchmark.md
+
+Builds every index kind over the same corpus, sweeps nprobe / efSearch,
+and measures recall@k against exact flat search plus mean query latency.
+Without --vectors the corpus is a synthetic Gaussian mixture; pass a .npy
+file of real embeddings (e.g. dumped from the embedding cache) for numbers
+that reflect our data.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from agents.core.ann_index import apply_search_params, build_index
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f[:k]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(vectors: np.ndarray, queries: np.ndarray, k: int, metric: str) -> list[dict]:
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    if metric == "cosine":
+        faiss.normalize_L2(vectors)
+        faiss.normalize_L2(queries)
+    dim = vectors.shape[1]
+
+    rows = []
+    sweeps = {
+        "flat": [None],
+        "ivf": [1, 4, 16, 64],
+        "hnsw": [16, 32, 64, 128],
+        "ivfpq": [4, 16, 64],
+    }
+    # Exact neighbours from brute-force search are the ground truth
+    _, truth = build_index("flat", dim, vectors, metric).search(queries, k)
+    for kind, params in sweeps.items():
+        start = time.perf_counter()
+        index = build_index(kind, dim, vectors, metric)
+        build_s = time.perf_counter() - start
+        for param in params:
+            if kind == "hnsw":
+                apply_search_params(index, ef_search=param)
+            elif param is not None:
+                apply_search_params(index, nprobe=param)
+            # One query at a time, matching how missions hit the index
+            found = []
+            start = time.perf_counter()
+            for q in queries:
+                found.append(index.search(q.reshape(1, -1), k)[1][0])
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            rows.append({
+                "index": kind,
+                "param": "-" if param is None else (f"efSearch={param}" if kind == "hnsw" else f"nprobe={param}"),
+                "recall": recall_at_k(found, truth),
+                "latency_ms": latency_ms,
+                "build_s": build_s,
+            })
+    return rows
+
+
+def to_markdown(rows: list[dict], n: int, dim: int, k: int, metric: str, source: str) -> str:
+    lines = [
+        f"# ANN operating points ({source}, n={n}, dim={dim}, metric={metric})",
+        "",
+        f"| index | search param | recall@{k} | latency / query (ms) | build (s) |",
+        "|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['index']} | {r['param']} | {r['recall']:.3f} | {r['latency_ms']:.3f} | {r['build_s']:.2f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=["l2", "cosine"], default="cosine")
+    parser.add_argument("--vectors", help="optional .npy file of real embeddings")
+    parser.add_argument("--out", help="write the markdown report here as well")
+    args = parser.parse_args()
+
+    if args.vectors:
+        data = np.load(args.vectors).astype(np.float32)
+        source = args.vectors
+    else:
+        data = synthetic_corpus(args.n + args.queries, args.dim)
+        source = "synthetic"
+    corpus, queries = data[:-args.queries], data[-args.queries:]
+
+    report = to_markdown(run(corpus, queries, args.k, args.metric), len(corpus), corpus.shape[1], args.k, args.metric, source)
+    print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report)
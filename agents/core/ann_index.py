@@ -0,0 +1,234 @@
+"""Size-adaptive FAISS index used by VectorStore and AgentMemory.
+
+`AdaptiveIndex` starts as an exact flat index and, once the corpus crosses
+the configured threshold, is rebuilt in a background thread as IVF-Flat
+or HNSW. IVF-PQ is opt-in (ANN_PQ_THRESHOLD, off by default) and always
+re-ranks its candidates exactly, since raw 8-bit PQ recall is too low to
+serve on its own (see docs/ann_benchmark.md). Queries keep hitting the
+current index while a rebuild runs; vectors added meanwhile are replayed
+into the new index before it is swapped in. Evictions (remove_oldest) are
+applied to the ids returned by search right away and folded into the
+index by the same background rebuild.
+
+With `metric="cosine"` vectors are L2-normalized and searched by inner
+product, so scores are similarities (higher is better) rather than L2
+distances; check `higher_is_better` when merging results.
+"""
+
+import math
+import os
+import threading
+
+import faiss
+import numpy as np
+
+IVF_THRESHOLD = int(os.getenv("ANN_IVF_THRESHOLD", "50000"))
+# 0 disables IVF-PQ; set it (e.g. 1000000) to cap index memory on very large corpora
+PQ_THRESHOLD = int(os.getenv("ANN_PQ_THRESHOLD", "0"))
+# IVF-PQ re-ranks k * PQ_REFINE_FACTOR candidates with exact distances
+PQ_REFINE_FACTOR = float(os.getenv("ANN_PQ_REFINE_FACTOR", "8"))
+# Index used between the two thresholds: "ivf" (IVF-Flat) or "hnsw"
+MID_KIND = os.getenv("ANN_MID_KIND", "ivf")
+NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("ANN_EF_SEARCH", "64"))
+
+
+def apply_search_params(index, nprobe: int = NPROBE, ef_search: int = EF_SEARCH):
+    """Sets nprobe / efSearch on any IVF or HNSW index (no-op for flat ones)."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def target_kind(n: int, ivf_threshold: int = IVF_THRESHOLD, pq_threshold: int = PQ_THRESHOLD,
+                mid_kind: str = MID_KIND) -> str:
+    """Index kind for a corpus of `n` vectors."""
+    if pq_threshold and n >= pq_threshold:
+        return "ivfpq"
+    if n >= ivf_threshold:
+        return mid_kind
+    return "flat"
+
+
+def build_index(kind: str, dimension: int, vectors: np.ndarray, metric: str = "l2"):
+    """
+    Builds and fills an index of `kind` ("flat", "ivf", "hnsw" or "ivfpq")
+    from already-normalized float32 `vectors`, training it if needed.
+    """
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+    n = len(vectors)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, 32, faiss_metric)
+        index.hnsw.efConstruction = 80
+    elif kind in ("ivf", "ivfpq"):
+        # ~4*sqrt(n) lists, with enough training points per list
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+        if kind == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+        else:
+            # Largest sub-quantizer count that divides the dimension, ~1 per 8 dims
+            m = max(d for d in range(1, dimension // 8 + 1) if dimension % d == 0)
+            pq = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8, faiss_metric)
+            index = faiss.IndexRefineFlat(pq)
+            index.k_factor = PQ_REFINE_FACTOR
+        sample = vectors
+        if n > 256 * nlist:
+            sample = vectors[np.random.default_rng(0).choice(n, 256 * nlist, replace=False)]
+        index.train(sample)
+    else:
+        index = faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+
+    if n:
+        index.add(vectors)
+    return index
+
+
+class AdaptiveIndex:
+    def __init__(
+        self,
+        dimension: int,
+        metric: str = "l2",
+        ivf_threshold: int = IVF_THRESHOLD,
+        pq_threshold: int = PQ_THRESHOLD,
+        mid_kind: str = MID_KIND,
+        nprobe: int = NPROBE,
+        ef_search: int = EF_SEARCH,
+        background: bool = True,
+    ):
+        self.dimension = dimension
+        self.metric = metric
+        self.higher_is_better = metric == "cosine"
+        self.ivf_threshold = ivf_threshold
+        self.pq_threshold = pq_threshold
+        self.mid_kind = mid_kind
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.background = background
+
+        self.kind = "flat"
+        self.index = build_index("flat", dimension, np.empty((0, dimension), dtype=np.float32), metric)
+        # Raw vectors are kept so the index can be retrained or rebuilt at any size
+        self._vectors = np.empty((1024, dimension), dtype=np.float32)
+        self._count = 0
+        self._lock = threading.RLock()
+        self._rebuilding = None
+        # Size the current IVF index was trained at, and a counter bumped by
+        # remove_oldest() so an in-flight rebuild can tell its snapshot is stale
+        self._trained_at = 0
+        self._generation = 0
+        # Leading rows of self.index already evicted by remove_oldest() but not yet rebuilt away
+        self._removed = 0
+
+    @property
+    def ntotal(self) -> int:
+        return self._count
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if self.metric == "cosine":
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def target_kind(self, n: int) -> str:
+        return target_kind(n, self.ivf_threshold, self.pq_threshold, self.mid_kind)
+
+    def add(self, vectors):
+        vectors = self._prepare(vectors)
+        with self._lock:
+            needed = self._count + len(vectors)
+            if needed > len(self._vectors):
+                grown = np.empty((max(needed, 2 * len(self._vectors)), self.dimension), dtype=np.float32)
+                grown[:self._count] = self._vectors[:self._count]
+                self._vectors = grown
+            self._vectors[self._count:needed] = vectors
+            self._count = needed
+            self.index.add(vectors)
+        self._maybe_rebuild()
+
+    def search(self, queries, k: int):
+        queries = self._prepare(queries)
+        with self._lock:
+            index = self.index
+            removed = self._removed
+            apply_search_params(index, self.nprobe, self.ef_search)
+            scores, ids = index.search(queries, k + removed)
+        if not removed:
+            return scores, ids
+        # Skip evicted rows and shift the rest down to current ids
+        out_scores = np.full((len(ids), k), -np.inf if self.higher_is_better else np.inf, dtype=np.float32)
+        out_ids = np.full((len(ids), k), -1, dtype=np.int64)
+        for row in range(len(ids)):
+            keep = ids[row] >= removed
+            kept_ids = ids[row][keep][:k] - removed
+            out_ids[row, :len(kept_ids)] = kept_ids
+            out_scores[row, :len(kept_ids)] = scores[row][keep][:k]
+        return out_scores, out_ids
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+
+    def remove_oldest(self, count: int):
+        """
+        Drops the first `count` vectors; ids of the rest shift down by `count`
+        immediately. The index itself is rebuilt without them in the
+        background, so queries are never blocked behind the rebuild.
+        """
+        with self._lock:
+            count = min(count, self._count)
+            if not count:
+                return
+            self._vectors[:self._count - count] = self._vectors[count:self._count]
+            self._count -= count
+            self._removed += count
+            self._generation += 1
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        with self._lock:
+            kind = self.target_kind(self._count)
+            # IVF centroids go stale as the corpus grows, so retrain every 4x
+            stale = kind == self.kind and kind not in ("flat", "hnsw") and self._count >= 4 * self._trained_at
+            if (kind == self.kind and not stale and not self._removed) or self._rebuilding is not None:
+                return
+            self._rebuilding = True
+        if self.background:
+            self._rebuilding = threading.Thread(target=self._rebuild, daemon=True)
+            self._rebuilding.start()
+        else:
+            self._rebuild()
+
+    def _rebuild(self):
+        try:
+            while True:
+                with self._lock:
+                    n = self._count
+                    kind = self.target_kind(n)
+                    generation = self._generation
+                    snapshot = self._vectors[:n].copy()
+                print(f"🧭 AdaptiveIndex: Rebuilding {n} vectors as {kind}...")
+                index = build_index(kind, self.dimension, snapshot, self.metric)
+                with self._lock:
+                    if generation != self._generation:
+                        # Rows were evicted meanwhile; the snapshot's ids no longer line up
+                        continue
+                    # Replay whatever arrived while we were training
+                    if self._count > n:
+                        index.add(self._vectors[n:self._count])
+                    self.index = index
+                    self.kind = kind
+                    self._trained_at = n
+                    self._removed = 0
+                print(f"🧭 AdaptiveIndex: Switched to {kind} at {self._count} vectors.")
+                return
+        except Exception as e:
+            print(f"AdaptiveIndex rebuild failed: {e}")
+        finally:
+            self._rebuilding = None
@@ -0,0 +1,71 @@
+"""Splits search results and uploaded files into overlapping chunks.
+
+Chunks are bounded by an approximate token count (whitespace-delimited
+words) and cut from the original text, so spacing and punctuation are
+preserved. Each chunk is a dict carrying its text plus source metadata
+(`source`, `title`, `position`), ready for AgentMemory.add_chunks().
+`chunk_stream()` does the same over text arriving piece by piece (e.g.
+PDF pages from the extraction pool), emitting chunks as soon as they fill.
+"""
+
+import os
+import re
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "32"))
+
+_WORD = re.compile(r"\S+")
+
+
+def chunk_stream(pieces, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+    """
+    Yields windows of at most `max_tokens` words over the concatenated
+    `pieces` (joined by newlines), consecutive windows sharing `overlap` words.
+    """
+    step = max(1, max_tokens - overlap)
+    buffer = ""
+    spans = []
+    start = 0
+    emitted = False
+    for piece in pieces:
+        if not piece:
+            continue
+        if buffer:
+            buffer += "\n"
+        offset = len(buffer)
+        buffer += piece
+        spans.extend((offset + a, offset + b) for a, b in (m.span() for m in _WORD.finditer(piece)))
+        while len(spans) - start >= max_tokens:
+            yield buffer[spans[start][0]:spans[start + max_tokens - 1][1]]
+            emitted = True
+            start += step
+        # Drop text no window can reach any more
+        if start and start >= len(spans) // 2:
+            cut = spans[start][0] if start < len(spans) else len(buffer)
+            buffer = buffer[cut:]
+            spans = [(a - cut, b - cut) for a, b in spans[start:]]
+            start = 0
+    remaining = len(spans) - start
+    if remaining > 0 and (not emitted or remaining > overlap):
+        yield buffer[spans[start][0]:spans[-1][1]]
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """Windows of at most `max_tokens` words, consecutive windows sharing `overlap` words."""
+    return list(chunk_stream([text or ""], max_tokens, overlap))
+
+
+def chunk_document(text: str, source: str = None, title: str = None,
+                   max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> list[dict]:
+    return [
+        {"text": chunk, "source": source, "title": title, "position": i}
+        for i, chunk in enumerate(chunk_text(text, max_tokens, overlap))
+    ]
+
+
+def chunk_search_results(results: list[dict], max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> list[dict]:
+    """Chunks every Tavily result dict separately so each chunk maps back to one URL."""
+    chunks = []
+    for result in results:
+        chunks.extend(chunk_document(result.get("content") or "", result.get("url"), result.get("title"), max_tokens, overlap))
+    return chunks
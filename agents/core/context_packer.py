@@ -0,0 +1,161 @@
+"""Token budgets for the context pasted into agent prompts.
+
+Each stage (planner, analysis, hypothesis, synthesis, synthesis_map) gets
+a token budget (CONTEXT_BUDGETS) for the variable part of its prompt:
+search data, memory hits, file excerpts, analyses. `pack()` splits that budget across the
+sources in proportion to their relevance (a source that needs less than
+its share hands the rest to the others), trims each source at a sentence
+boundary to fit, and logs tokens in/out per call. Tokens are counted with
+tiktoken once `load_encoder()` has run, else estimated at ~4 characters
+per token like the gateway's rate-limit estimate. Loading may download the
+BPE file (unless it is in TIKTOKEN_CACHE_DIR), so it is never done lazily
+from count_tokens(): servers call load_encoder() in a worker thread at
+startup.
+"""
+
+import math
+import os
+import re
+import threading
+
+CONTEXT_ENCODING = os.getenv("CONTEXT_ENCODING", "cl100k_base")
+
+
+def _parse_budgets(spec: str) -> dict:
+    """'analysis=2500,synthesis=4000' -> {'analysis': 2500, 'synthesis': 4000}"""
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            stage, tokens = item.split("=", 1)
+            budgets[stage.strip()] = int(tokens)
+    return budgets
+
+
+CONTEXT_BUDGETS = _parse_budgets(os.getenv(
+    "CONTEXT_BUDGETS", "planner=600,analysis=2500,hypothesis=2000,synthesis=4000,synthesis_map=3000"
+))
+DEFAULT_BUDGET = 2000
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) or a line break
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)|\n")
+_WORD_END = re.compile(r"\S(?=\s|$)")
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def load_encoder():
+    """
+    Loads the tiktoken encoding (blocking, may hit the network); call it off
+    the event loop. Runs once; on failure tokens stay estimated.
+    """
+    global _encoder, _encoder_loaded
+    with _encoder_lock:
+        if _encoder_loaded:
+            return _encoder
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(CONTEXT_ENCODING)
+            print(f"📦 ContextPacker: Loaded tiktoken encoding '{CONTEXT_ENCODING}'")
+        except Exception as e:
+            print(f"WARNING: tiktoken unavailable ({type(e).__name__}); estimating tokens from length")
+        return _encoder
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _encoder
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole sentences within `max_tokens` (whole words if no sentence fits)."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    for pattern in (_SENTENCE_END, _WORD_END):
+        ends = [m.end() for m in pattern.finditer(text)]
+        # Binary search for the last boundary whose prefix still fits
+        lo, hi, best = 0, len(ends) - 1, None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if count_tokens(text[:ends[mid]]) <= max_tokens:
+                best, lo = ends[mid], mid + 1
+            else:
+                hi = mid - 1
+        if best is not None:
+            return text[:best].rstrip()
+    return ""
+
+
+def _allocate(sizes: list[int], weights: list[float], budget: int) -> list[int]:
+    """Splits `budget` in proportion to `weights`; sources smaller than their share keep their size."""
+    allocation = [0] * len(sizes)
+    active = [i for i, size in enumerate(sizes) if size > 0]
+    remaining = budget
+    while active and remaining > 0:
+        total = sum(weights[i] for i in active) or len(active)
+        shares = {i: remaining * (weights[i] or 1) / total for i in active}
+        fits = [i for i in active if sizes[i] <= shares[i]]
+        if not fits:
+            for i in active:
+                allocation[i] = int(shares[i])
+            break
+        for i in fits:
+            allocation[i] = sizes[i]
+            remaining -= sizes[i]
+            active.remove(i)
+    return allocation
+
+
+def pack(sources: list, stage: str, budget: int = None, separator: str = "\n\n") -> str:
+    """
+    Joins `sources` (strings, or dicts with "text" and an optional
+    "score") into at most `budget` tokens, defaulting to the stage's
+    CONTEXT_BUDGETS entry. Strings and unscored dicts weigh 1.0.
+    Sources keep their order; a source whose share is too small for even
+    one sentence is dropped.
+    """
+    budget = budget if budget is not None else CONTEXT_BUDGETS.get(stage, DEFAULT_BUDGET)
+    texts = [s["text"] if isinstance(s, dict) else s for s in sources]
+    weights = [float(s.get("score") or 1.0) if isinstance(s, dict) else 1.0 for s in sources]
+    sizes = [count_tokens(t) for t in texts]
+    tokens_in = sum(sizes)
+    budget -= count_tokens(separator) * max(0, len(texts) - 1)
+
+    allocation = _allocate(sizes, weights, budget)
+    packed = []
+    trimmed = 0
+    for text, size, limit in zip(texts, sizes, allocation):
+        if size > limit:
+            trimmed += 1
+            text = trim_to_tokens(text, limit)
+        if text:
+            packed.append(text)
+    result = separator.join(packed)
+    tokens_out = count_tokens(result)
+
+    with _stats_lock:
+        stats = _stats.setdefault(stage, {"calls": 0, "tokens_in": 0, "tokens_out": 0, "trimmed": 0})
+        stats["calls"] += 1
+        stats["tokens_in"] += tokens_in
+        stats["tokens_out"] += tokens_out
+        stats["trimmed"] += trimmed
+    if trimmed:
+        print(f"📦 ContextPacker [{stage}]: {tokens_in} -> {tokens_out} tokens ({trimmed}/{len(texts)} sources trimmed)")
+    else:
+        print(f"📦 ContextPacker [{stage}]: {tokens_in} tokens (within budget)")
+    return result
+
+
+def packing_stats() -> dict:
+    with _stats_lock:
+        return {stage: dict(stats) for stage, stats in _stats.items()}
@@ -0,0 +1,206 @@
+"""Per-document chunk index for uploaded files, keyed by content hash.
+
+An uploaded file is parsed once, right after upload, into
+`<root>/<sha256>/`:
+
+    meta.json    status ("pending" | "parsing" | "ready" | "partial" | "failed"), file path
+    text.txt     the extracted text
+    chunks.json  chunk dicts from agents.core.chunking
+    vectors.npy  L2-normalized chunk embeddings (when an embedder is available)
+
+Missions then pass the document id (the SHA-256) and pull only the chunks
+relevant to their topic, so repeat missions over the same paper never
+re-parse it. Without embeddings, chunks are ranked with BM25. A document
+whose extraction skipped some pages is stored as "partial": its chunks
+are served, and the next build() parses it again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from agents.core.chunking import chunk_stream
+from agents.core.extraction import ExtractionError, iter_pages
+from agents.core.lexical_index import BM25Index
+
+DOCUMENT_INDEX_DIR = os.getenv("DOCUMENT_INDEX_DIR", "./.cache/documents")
+# Loaded documents kept in memory (vectors stay memory-mapped)
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "16"))
+# Chunks embedded per batch while pages are still being extracted
+EMBED_BATCH = 64
+
+
+def file_sha256(file_path: str, chunk_bytes: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _LoadedDocument:
+    def __init__(self, chunks: list[dict], vectors=None):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.lexical = None
+        if vectors is None:
+            self.lexical = BM25Index()
+            for i, chunk in enumerate(chunks):
+                self.lexical.add(i, chunk["text"])
+
+
+class DocumentIndex:
+    def __init__(self, root: str = DOCUMENT_INDEX_DIR, embedder=None, cache_size: int = DOCUMENT_CACHE_SIZE):
+        self.root = root
+        # EmbeddingCache (or anything with encode(texts) -> float32 array); None means BM25 only
+        self.embedder = embedder
+        self.cache_size = cache_size
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._doc_locks = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, document_id: str) -> str:
+        if not document_id or not all(c in "0123456789abcdef" for c in document_id):
+            raise ValueError(f"Invalid document id: {document_id!r}")
+        return os.path.join(self.root, document_id)
+
+    def _doc_lock(self, document_id: str) -> threading.Lock:
+        with self._lock:
+            return self._doc_locks.setdefault(document_id, threading.Lock())
+
+    def meta(self, document_id: str) -> dict:
+        path = os.path.join(self._dir(document_id), "meta.json")
+        if not os.path.exists(path):
+            return {"status": "missing"}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, document_id: str, **meta):
+        directory = self._dir(document_id)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    def register(self, document_id: str, file_path: str, source: str = None):
+        """Records where an upload lives so it can be parsed later (no-op if already known)."""
+        if self.meta(document_id)["status"] == "missing":
+            self._write_meta(document_id, status="pending", path=file_path, source=source)
+
+    def build(self, document_id: str, file_path: str = None, source: str = None) -> dict:
+        """
+        Extracts, chunks and embeds a document unless that was already done.
+        Concurrent calls for the same document wait for the first one.
+        Raises (and records "failed") if no text could be extracted.
+        """
+        with self._doc_lock(document_id):
+            meta = self.meta(document_id)
+            if meta["status"] == "ready":
+                return meta
+            file_path = file_path or meta.get("path")
+            source = source or meta.get("source") or (os.path.basename(file_path) if file_path else None)
+            if not file_path:
+                raise FileNotFoundError(f"No file registered for document {document_id}")
+
+            directory = self._dir(document_id)
+            self._write_meta(document_id, status="parsing", path=file_path, source=source)
+            print(f"📄 DocumentIndex: Parsing {source} ({document_id[:12]})...")
+            skipped = None
+            try:
+                pages = []
+
+                def collect():
+                    nonlocal skipped
+                    try:
+                        for page in iter_pages(file_path):
+                            pages.append(page)
+                            yield page
+                    except ExtractionError as e:
+                        if not (e.partial and pages):
+                            raise
+                        skipped = str(e)
+
+                # Pages stream in from the extraction pool; chunks are embedded
+                # in batches while later pages are still being extracted
+                chunks, batches = [], []
+                for chunk in chunk_stream(collect()):
+                    chunks.append({"text": chunk, "source": source, "title": "Uploaded file", "position": len(chunks)})
+                    if self.embedder is not None and len(chunks) % EMBED_BATCH == 0:
+                        batches.append(self._embed(chunks[-EMBED_BATCH:]))
+                if self.embedder is not None and len(chunks) % EMBED_BATCH:
+                    batches.append(self._embed(chunks[-(len(chunks) % EMBED_BATCH):]))
+
+                text = "\n".join(pages)
+                with open(os.path.join(directory, "text.txt"), "w", encoding="utf-8") as f:
+                    f.write(text)
+                with open(os.path.join(directory, "chunks.json"), "w", encoding="utf-8") as f:
+                    json.dump(chunks, f)
+                if batches:
+                    np.save(os.path.join(directory, "vectors.npy"), np.concatenate(batches))
+            except Exception as e:
+                self._write_meta(document_id, status="failed", path=file_path, source=source, error=str(e))
+                raise
+
+            meta = {"status": "ready", "path": file_path, "source": source, "chunks": len(chunks), "chars": len(text)}
+            if skipped:
+                meta.update(status="partial", error=skipped)
+            self._write_meta(document_id, **meta)
+            with self._lock:
+                self._loaded.pop(document_id, None)
+            if skipped:
+                print(f"⚠️ DocumentIndex: {source} partially parsed ({len(chunks)} chunks; {skipped}); will retry on next build.")
+            else:
+                print(f"📄 DocumentIndex: {source} ready ({len(chunks)} chunks).")
+            return meta
+
+    def _embed(self, chunks: list[dict]) -> np.ndarray:
+        vectors = np.array(self.embedder.encode([c["text"] for c in chunks]), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def _load(self, document_id: str) -> _LoadedDocument:
+        with self._lock:
+            doc = self._loaded.get(document_id)
+            if doc is not None:
+                self._loaded.move_to_end(document_id)
+                return doc
+
+        directory = self._dir(document_id)
+        with open(os.path.join(directory, "chunks.json"), encoding="utf-8") as f:
+            chunks = json.load(f)
+        vectors = None
+        vectors_path = os.path.join(directory, "vectors.npy")
+        if self.embedder is not None and os.path.exists(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode="r")
+        doc = _LoadedDocument(chunks, vectors)
+
+        with self._lock:
+            self._loaded[document_id] = doc
+            while len(self._loaded) > self.cache_size:
+                self._loaded.popitem(last=False)
+        return doc
+
+    def retrieve(self, document_id: str, query: str, k: int = 4) -> list[dict]:
+        """Top-k chunks of a ready document for `query`, in document order."""
+        doc = self._load(document_id)
+        if not doc.chunks:
+            return []
+        if doc.vectors is not None:
+            query_vec = np.array(self.embedder.encode([query]), dtype=np.float32)[0]
+            query_vec /= max(float(np.linalg.norm(query_vec)), 1e-12)
+            scores = doc.vectors @ query_vec
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            positions = [int(i) for i in top]
+        else:
+            positions = [doc_id for _, doc_id in doc.lexical.search(query, k)] or list(range(min(k, len(doc.chunks))))
+        return [doc.chunks[i] for i in sorted(positions)]
+
+    def text(self, document_id: str) -> str:
+        with open(os.path.join(self._dir(document_id), "text.txt"), encoding="utf-8") as f:
+            return f.read()
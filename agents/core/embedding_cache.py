@@ -0,0 +1,124 @@
+"""Persistent, content-addressed cache of sentence embeddings.
+
+Vectors are appended to a flat float32 file that is memory-mapped for
+reads, and a sibling `.keys` file holds the SHA-256 digest of each row's
+text in the same order. Lookups for cached texts are served straight from
+the map; only misses reach the SentenceTransformer, in a single batch.
+Several processes on one host can share the files: appends are serialized
+with an advisory lock and readers pick up new rows when the key file grows.
+"""
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+DIGEST_SIZE = 32
+DEFAULT_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.cache/embeddings")
+
+
+class EmbeddingCache:
+    def __init__(self, model, model_name: str = "all-MiniLM-L6-v2", cache_dir: str = DEFAULT_CACHE_DIR):
+        self.model = model
+        self.dimension = model.get_sentence_embedding_dimension()
+        os.makedirs(cache_dir, exist_ok=True)
+        base = os.path.join(cache_dir, model_name.replace("/", "_"))
+        self.vectors_path = f"{base}.f32"
+        self.keys_path = f"{base}.keys"
+        for path in (self.vectors_path, self.keys_path):
+            open(path, "ab").close()
+
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._keys_read = 0
+        self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _refresh(self):
+        """Indexes keys appended since the last refresh (by us or another worker) and remaps."""
+        size = os.path.getsize(self.keys_path)
+        size -= size % DIGEST_SIZE
+        if size == self._keys_read:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_read)
+            data = f.read(size - self._keys_read)
+        row = self._keys_read // DIGEST_SIZE
+        for offset in range(0, len(data), DIGEST_SIZE):
+            self._rows.setdefault(data[offset:offset + DIGEST_SIZE], row)
+            row += 1
+        self._keys_read = size
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(row, self.dimension))
+
+    def _append(self, digests: list[bytes], vectors: np.ndarray):
+        with open(self.keys_path, "ab") as keys_file:
+            if fcntl:
+                fcntl.flock(keys_file, fcntl.LOCK_EX)
+            try:
+                # Rows are positional, so the vector file must be exactly as
+                # long as the key file says before we append to both.
+                rows = os.path.getsize(self.keys_path) // DIGEST_SIZE
+                with open(self.vectors_path, "r+b") as vectors_file:
+                    vectors_file.truncate(rows * self.dimension * 4)
+                    vectors_file.seek(0, os.SEEK_END)
+                    vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                    vectors_file.flush()
+                keys_file.write(b"".join(digests))
+                keys_file.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(keys_file, fcntl.LOCK_UN)
+
+    def get(self, text: str):
+        """Returns a read-only view of the cached vector for `text`, or None."""
+        with self._lock:
+            row = self._rows.get(self._digest(text))
+            return None if row is None else self._vectors[row]
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """
+        Returns a (len(texts), dimension) float32 array. Cached rows are read
+        from the memory map; misses are encoded together and persisted.
+        A request fully served by one contiguous run of rows is returned as
+        a view of the map without copying.
+        """
+        digests = [self._digest(t) for t in texts]
+        with self._lock:
+            self._refresh()
+            missing = {}
+            for digest, text in zip(digests, texts):
+                if digest not in self._rows and digest not in missing:
+                    missing[digest] = text
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                fresh = self.model.encode(list(missing.values()), convert_to_numpy=True).astype(np.float32)
+                self._append(list(missing.keys()), fresh)
+                self._refresh()
+
+            rows = [self._rows[d] for d in digests]
+            if rows and rows == list(range(rows[0], rows[0] + len(rows))):
+                return self._vectors[rows[0]:rows[0] + len(rows)]
+            return np.asarray(self._vectors[rows], dtype=np.float32).reshape(len(rows), self.dimension)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,187 @@
+"""Text extraction for uploaded files: PDF text, OCR for images, raw text otherwise.
+
+PDFs are split into page ranges that are extracted in parallel on a
+process pool, and `iter_pages()` yields page text in order as soon as each
+range is done, so chunking/embedding can start before the whole document
+is parsed. Images are converted to grayscale, contrast-stretched and
+downscaled before OCR. Workers are started with forkserver (spawn where
+it is unavailable), never fork, so they don't inherit the server's
+threads and locks. Each pool job has a timeout; a range that times out is
+skipped and its pool is retired with its workers killed, so a hung parser
+can't hold a worker forever. Jobs of other documents that were on the
+retired pool are resubmitted to its replacement. A range that fails is
+skipped; `iter_pages()` raises ExtractionError after the last page if
+anything was skipped, so callers can tell a partial document from a
+complete one.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as JobTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "webp")
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+PAGES_PER_JOB = int(os.getenv("EXTRACTION_PAGES_PER_JOB", "16"))
+JOB_TIMEOUT = float(os.getenv("EXTRACTION_JOB_TIMEOUT", "120"))
+# Longest image side fed to tesseract; larger scans are downscaled first
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2000"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ExtractionError(Exception):
+    """Raised when a file yields no usable text, or only part of it (`partial`)."""
+
+    def __init__(self, message: str, partial: bool = False):
+        super().__init__(message)
+        self.partial = partial
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        # A pool whose worker died on its own is broken for good; replace it
+        if _pool is None or _pool._broken:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=_mp_context())
+        return _pool
+
+
+def _retire_pool(pool: ProcessPoolExecutor):
+    """Kills a pool with a stuck worker; the next submission starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool = None
+    print("⚠️ Extraction pool retired after a job timeout; starting a fresh one.")
+    workers = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in workers:
+        process.kill()
+
+
+def _result(job: list, fn, args: tuple, timeout: float):
+    """
+    Waits for `job` ([pool, future]). A job lost with its pool (retired
+    after another job's timeout, or broken by a dead worker) is resubmitted
+    once; on its own timeout the pool is retired and JobTimeout raised.
+    """
+    for attempt in range(2):
+        pool, future = job
+        try:
+            return future.result(timeout=timeout)
+        except JobTimeout:
+            _retire_pool(pool)
+            raise
+        except (BrokenProcessPool, CancelledError):
+            if attempt:
+                raise
+            job[:] = _submit(fn, *args)
+
+
+def _submit(fn, *args) -> list:
+    pool = _get_pool()
+    return [pool, pool.submit(fn, *args)]
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _pdf_page_count(file_path: str) -> int:
+    import PyPDF2
+    with open(file_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_pdf_range(file_path: str, start: int, end: int) -> list[str]:
+    """Runs in a pool worker: text of pages [start, end), "" for unreadable pages."""
+    import PyPDF2
+    pages = []
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for i in range(start, end):
+            try:
+                pages.append(reader.pages[i].extract_text() or "")
+            except Exception as e:
+                print(f"PDF page {i} extraction failed: {e}")
+                pages.append("")
+    return pages
+
+
+def _ocr_image(file_path: str, max_side: int = OCR_MAX_SIDE) -> str:
+    """Runs in a pool worker: grayscale, autocontrast and downscale, then tesseract."""
+    import pytesseract
+    from PIL import Image, ImageOps
+    img = Image.open(file_path)
+    img = ImageOps.autocontrast(ImageOps.grayscale(img))
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+    return pytesseract.image_to_string(img)
+
+
+def iter_pages(file_path: str, pages_per_job: int = PAGES_PER_JOB, timeout: float = JOB_TIMEOUT):
+    """
+    Yields the file's text page by page (a single piece for non-PDFs), in
+    order. Raises ExtractionError if OCR fails, or (with partial=True)
+    after the last page if some PDF ranges were skipped.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+
+    ext = file_path.lower().split('.')[-1]
+    if ext == 'pdf':
+        count = _pdf_page_count(file_path)
+        ranges = [(start, min(start + pages_per_job, count)) for start in range(0, count, pages_per_job)]
+        jobs = [_submit(_extract_pdf_range, file_path, start, end) for start, end in ranges]
+        skipped = []
+        try:
+            for (start, end), job in zip(ranges, jobs):
+                try:
+                    pages = _result(job, _extract_pdf_range, (file_path, start, end), timeout)
+                except JobTimeout:
+                    skipped.append(f"{start}-{end}")
+                    print(f"PDF pages {start}-{end} timed out after {timeout}s; skipped.")
+                    continue
+                except Exception as e:
+                    skipped.append(f"{start}-{end}")
+                    print(f"PDF pages {start}-{end} failed: {e}")
+                    continue
+                for text in pages:
+                    if text:
+                        yield text
+        finally:
+            for _, future in jobs:
+                future.cancel()
+        if skipped:
+            raise ExtractionError(f"PDF pages {', '.join(skipped)} could not be extracted", partial=True)
+        return
+
+    if ext in IMAGE_EXTENSIONS:
+        try:
+            text = _result(_submit(_ocr_image, file_path), _ocr_image, (file_path,), timeout)
+        except Exception as ocr_e:
+            print(f"OCR Error: {ocr_e}")
+            raise ExtractionError(f"Failed to read image via OCR: {ocr_e}") from ocr_e
+        yield text
+        return
+
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        yield f.read()
+
+
+def extract_text(file_path: str) -> str:
+    return "\n".join(iter_pages(file_path))
@@ -0,0 +1,69 @@
+"""Incremental inverted index with Okapi BM25 scoring.
+
+Used by AgentMemory as the lexical half of hybrid retrieval, and on its
+own when FAISS / sentence-transformers are unavailable, so retrieval cost
+scales with the postings of the query terms rather than with every stored
+document. Documents are added and removed one at a
+time; top-k extraction uses a heap.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; digits are kept so 'gt 650' or 'h2o' still match."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}              # doc_id -> number of tokens
+        self.doc_terms = {}                # doc_id -> distinct terms (for removal)
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, text: str):
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = list(counts)
+        self.total_length += length
+
+    def remove(self, doc_id: int):
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, int]]:
+        """Returns up to k (score, doc_id) pairs, best first; ties favour newer docs."""
+        n = len(self.doc_lengths)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, ((score, doc_id) for doc_id, score in scores.items()))
@@ -1,24 +1,301 @@
+"""Process-wide async gateway for every Groq call in ResearchPilot.
+
+All agents and chat endpoints share one `LLMGateway` (see `get_gateway`),
+which owns a single pooled `httpx.AsyncClient` with keep-alive, applies a
+request timeout, and caps in-flight requests per model with a semaphore.
+Completions are served from the persistent `ResponseCache` when an
+identical request was answered before; pass `use_cache=False` to bypass it.
+Every request goes through the shared "groq" RateLimiter (requests and
+tokens per minute) and is retried with backoff when Groq answers 429.
+Calls that name a `stage` instead of a model are routed by the ModelRouter
+(see model_router.py), which records latency, tokens and cost per stage and
+model; if the routed model fails with a timeout, a connection error, a 5xx
+or a 429 that outlasted the retries, the call is retried once on the faster
+tier. Client errors (other 4xx) are raised as they are: they would fail the
+same way on any model and say nothing about the model's health.
+"""
+
+import asyncio
 import os
-from groq import Groq
+import time
+import weakref
+
+import httpx
+from groq import APIConnectionError, AsyncGroq
 from dotenv import load_dotenv
 
+from agents.core.llm_cache import ResponseCache
+from agents.core.model_router import get_router
+from agents.core.rate_limiter import LLM_MAX_RETRIES, backoff_delay, get_limiter, is_rate_limited, retry_after, was_rejected
+
 load_dotenv()
 
-class GroqClient:
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
+# Switched to 3.1 8B model to bypass free-tier rate limits and decommissioned models
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+DEFAULT_SYSTEM_MESSAGE = "You are ResearchPilot AI."
+# Completion budget assumed for rate limiting when a call sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+def _parse_model_limits(raw: str) -> dict:
+    """Parses 'model-a=4,model-b=2' into {'model-a': 4, 'model-b': 2}."""
+    limits = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        model, value = item.split("=", 1)
+        try:
+            limits[model.strip()] = max(1, int(value))
+        except ValueError:
+            print(f"WARNING: Ignoring invalid LLM concurrency limit '{item}'")
+    return limits
+
+
+def _status(exc: Exception):
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def _is_client_error(exc: Exception) -> bool:
+    """400 (e.g. context length), 401, 404, 422...: the request itself is at fault."""
+    status = _status(exc)
+    return status is not None and 400 <= status < 500 and not is_rate_limited(exc)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Failures another model may not share: timeouts, connection errors, 5xx, exhausted 429s."""
+    if is_rate_limited(exc):
+        return True
+    status = _status(exc)
+    if status is not None:
+        return status >= 500
+    return isinstance(exc, (APIConnectionError, httpx.TransportError))
+
+
+class _LoopState:
+    """Connection pool and per-model semaphores bound to one event loop."""
+
+    def __init__(self, client: AsyncGroq):
+        self.client = client
+        self.semaphores = {}
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        api_key: str = None,
+        max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+        keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+        timeout: float = float(os.getenv("LLM_TIMEOUT", "60")),
+        default_concurrency: int = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "4")),
+        model_limits: dict = None,
+        cache: ResponseCache = None,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in .env file")
-        self.client = Groq(api_key=self.api_key)
-        # Switched to 3.1 8B model to bypass free-tier rate limits and decommissioned models
-        self.model = "llama-3.1-8b-instant" 
 
-    def generate(self, prompt: str, system_message: str = "You are ResearchPilot AI."):
-        chat_completion = self.client.chat.completions.create(
-            messages=[
+        self.default_model = DEFAULT_MODEL
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.default_concurrency = max(1, default_concurrency)
+        self.model_limits = model_limits if model_limits is not None else _parse_model_limits(
+            os.getenv("LLM_MODEL_CONCURRENCY", "")
+        )
+        self.limiter = get_limiter("groq")
+        self.router = get_router()
+        self.max_retries = max_retries
+        self.cache = cache
+        if self.cache is None and os.getenv("LLM_CACHE_ENABLED", "1") == "1":
+            try:
+                self.cache = ResponseCache()
+            except Exception as e:
+                print(f"WARNING: LLM response cache disabled: {e}")
+        # httpx pools and asyncio primitives cannot cross event loops, so each
+        # loop (uvicorn's, or a CLI's asyncio.run) gets its own lazily-built state.
+        self._states = weakref.WeakKeyDictionary()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            # Retries are ours (see _create), so the SDK's own are disabled
+            client = AsyncGroq(api_key=self.api_key, http_client=http_client, timeout=self.timeout, max_retries=0)
+            state = self._states[loop] = _LoopState(client)
+        return state
+
+    def _semaphore(self, state: _LoopState, model: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(model)
+        if semaphore is None:
+            limit = self.model_limits.get(model, self.default_concurrency)
+            semaphore = state.semaphores[model] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @staticmethod
+    def _estimate_tokens(messages: list[dict], params: dict) -> int:
+        # ~4 characters per token for the prompt, plus the completion budget
+        prompt = sum(len(m.get("content") or "") for m in messages) // 4
+        return prompt + params.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+    async def _create(self, state: _LoopState, model: str, messages: list[dict], estimated: int, **params):
+        """completions.create behind the shared rate limiter, retrying 429s with backoff."""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(estimated)
+            try:
+                return await state.client.chat.completions.create(messages=messages, model=model, **params)
+            except Exception as e:
+                # Only a request Groq never processed gets its tokens back; after a
+                # timeout or 5xx the estimate stands
+                if was_rejected(e):
+                    self.limiter.settle(estimated, 0)
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, retry_after(e))
+                self.limiter.penalize(delay)
+                print(f"⏳ LLMGateway: Groq rate limit hit, backing off {delay:.1f}s (attempt {attempt + 1})")
+
+    async def _cache_lookup(self, model: str, messages: list[dict], params: dict, use_cache: bool):
+        """Returns (key, cached_text); key is None when caching is off for this call."""
+        if not use_cache or self.cache is None:
+            return None, None
+        key = ResponseCache.make_key(model, messages, params)
+        try:
+            return key, await asyncio.to_thread(self.cache.get, key)
+        except Exception as e:
+            print(f"WARNING: LLM cache read failed: {e}")
+            return None, None
+
+    async def _cache_store(self, key: str, text: str):
+        if key is None or not text:
+            return
+        try:
+            await asyncio.to_thread(self.cache.set, key, text)
+        except Exception as e:
+            print(f"WARNING: LLM cache write failed: {e}")
+
+    def _record(self, stage: str, model: str, started: float, ok: bool, usage=None):
+        self.router.record(
+            stage, model, time.monotonic() - started, ok,
+            getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0),
+        )
+
+    async def chat(self, messages: list[dict], model: str = None, use_cache: bool = True, stage: str = None,
+                   **params) -> str:
+        """
+        Sends a full message list and returns the assistant reply text.
+        Without an explicit `model`, the model is picked by the router for `stage`.
+        Extra keyword arguments (temperature, max_tokens, ...) are passed through.
+        """
+        fallback = None
+        if model is None:
+            model, fallback = self.router.route(stage)
+        key, cached = await self._cache_lookup(model, messages, params, use_cache)
+        if cached is not None:
+            return cached
+
+        state = self._state()
+        estimated = self._estimate_tokens(messages, params)
+        started = time.monotonic()
+        try:
+            async with self._semaphore(state, model):
+                completion = await self._create(state, model, messages, estimated, **params)
+        except Exception as e:
+            if _is_client_error(e):
+                raise
+            self._record(stage, model, started, False)
+            if fallback is None or not _is_transient(e):
+                raise
+            print(f"🔀 LLMGateway: {model} failed for '{stage}' ({e}); retrying on {fallback}")
+            return await self.chat(messages, model=fallback, use_cache=use_cache, stage=stage, **params)
+        usage = getattr(completion, "usage", None)
+        self._record(stage, model, started, True, usage)
+        self.limiter.settle(estimated, getattr(usage, "total_tokens", None))
+        text = completion.choices[0].message.content
+        await self._cache_store(key, text)
+        return text
+
+    async def generate(self, prompt: str, system_message: str = DEFAULT_SYSTEM_MESSAGE, model: str = None,
+                       stage: str = None, **params) -> str:
+        return await self.chat(
+            [
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt},
             ],
-            model=self.model,
+            model=model,
+            stage=stage,
+            **params,
         )
-        return chat_completion.choices[0].message.content
\ No newline at end of file
+
+    async def stream(self, prompt: str, system_message: str = DEFAULT_SYSTEM_MESSAGE, model: str = None,
+                     use_cache: bool = True, stage: str = None, **params):
+        """
+        Async generator yielding completion text deltas as Groq produces them.
+        The model's concurrency slot is held until the stream is exhausted.
+        A cache hit is yielded as a single delta. A routed stream that fails
+        transiently before its first delta is retried on the faster tier.
+        """
+        fallback = None
+        if model is None:
+            model, fallback = self.router.route(stage)
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt},
+        ]
+        key, cached = await self._cache_lookup(model, messages, params, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        state = self._state()
+        estimated = self._estimate_tokens(messages, params)
+        started = time.monotonic()
+        usage = None
+        try:
+            async with self._semaphore(state, model):
+                chunks = await self._create(state, model, messages, estimated, stream=True, **params)
+                async for chunk in chunks:
+                    # Groq reports usage on the final chunk
+                    chunk_usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                    if chunk_usage is not None:
+                        usage = chunk_usage
+                        self.limiter.settle(estimated, getattr(usage, "total_tokens", None))
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            if _is_client_error(e):
+                raise
+            self._record(stage, model, started, False)
+            if fallback is None or parts or not _is_transient(e):
+                raise
+            print(f"🔀 LLMGateway: {model} failed for '{stage}' ({e}); retrying on {fallback}")
+            async for delta in self.stream(prompt, system_message, model=fallback, use_cache=use_cache,
+                                           stage=stage, **params):
+                yield delta
+            return
+        self._record(stage, model, started, True, usage)
+        await self._cache_store(key, "".join(parts))
+
+    async def aclose(self):
+        """Closes the connection pool of the current event loop, if any."""
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.close()
+
+
+_gateway = None
+
+
+def get_gateway() -> LLMGateway:
+    """Returns the process-wide gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway()
+    return _gateway
@@ -1,14 +1,38 @@
 """Robust AgentMemory with optional FAISS + SentenceTransformer support.
 
 If FAISS or sentence-transformers are not installed in the environment
-we fall back to a simple in-memory store with heuristic retrieval so the
+we fall back to an in-memory store with BM25 lexical retrieval so the
 package can be imported and the app can start.
+
+Facts are kept in namespaces (one per mission or session) so retrieval
+never crosses missions. A global entry/byte budget is enforced by evicting
+whole namespaces, least recently used first, plus any namespace idle for
+longer than `max_age` seconds.
+
+With FAISS available, retrieval is hybrid by default: the dense index and
+a BM25 index are queried in parallel and merged with reciprocal rank
+fusion, so exact-term queries (model numbers, formulas) still hit.
+
+Search results and files are ingested as chunks (see agents.core.chunking)
+via add_chunks(); exact and near-duplicate chunks are dropped before they
+are embedded, and the rest are encoded in one batch.
 """
 
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.core.lexical_index import BM25Index
+from agents.core.near_dup import NearDuplicateFilter
+
 try:
     import faiss
     import numpy as np
     from sentence_transformers import SentenceTransformer
+    from agents.core.embedding_cache import EmbeddingCache
+    from agents.core.ann_index import AdaptiveIndex
     _HAS_FAISS = True
 except Exception:
     # Missing native deps (faiss / sentence-transformers). Use fallback.
@@ -16,59 +40,218 @@ except Exception:
     _HAS_FAISS = False
 
 
+DEFAULT_NAMESPACE = "global"
+
+# Shared by all AgentMemory instances to run the dense and lexical legs side by side
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-retrieval")
+
+
+class _Namespace:
+    def __init__(self, dimension: int, use_faiss: bool, metric: str = "l2"):
+        # Exact flat search while small, upgraded to an ANN index as it grows
+        self.index = AdaptiveIndex(dimension, metric=metric) if use_faiss else None
+        # Lexical index; doc ids are positions offset by `base_id`,
+        # the number of facts trimmed from the front so far
+        self.lexical = BM25Index()
+        self.base_id = 0
+        self.documents = []
+        # Source metadata per document (url, title, chunk position)
+        self.metadata = []
+        self.dedup = NearDuplicateFilter()
+        self.bytes = 0
+        self.last_access = time.time()
+
+
 class AgentMemory:
-    def __init__(self, dimension=384):
+    def __init__(
+        self,
+        dimension=384,
+        max_entries: int = int(os.getenv("MEMORY_MAX_ENTRIES", "50000")),
+        max_bytes: int = int(os.getenv("MEMORY_MAX_BYTES", str(256 * 1024 * 1024))),
+        max_age: float = float(os.getenv("MEMORY_NAMESPACE_TTL", str(24 * 3600))),
+        metric: str = os.getenv("MEMORY_METRIC", "l2"),
+        retrieval_mode: str = os.getenv("MEMORY_RETRIEVAL_MODE", "hybrid"),
+        dense_k: int = int(os.getenv("MEMORY_DENSE_K", "20")),
+        lexical_k: int = int(os.getenv("MEMORY_LEXICAL_K", "20")),
+        dense_weight: float = float(os.getenv("MEMORY_DENSE_WEIGHT", "1.0")),
+        lexical_weight: float = float(os.getenv("MEMORY_LEXICAL_WEIGHT", "1.0")),
+        rrf_k: int = 60,
+    ):
         self.dimension = dimension
+        self.metric = metric
+        # "hybrid", "dense" or "lexical"; without FAISS only "lexical" is possible
+        self.retrieval_mode = retrieval_mode
+        self.dense_k = dense_k
+        self.lexical_k = lexical_k
+        self.dense_weight = dense_weight
+        self.lexical_weight = lexical_weight
+        self.rrf_k = rrf_k
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # namespace -> _Namespace, least recently used first
+        self.namespaces = OrderedDict()
+        self._lock = threading.RLock()
         if _HAS_FAISS:
-            # Initialize the embedding model and FAISS index
+            # Initialize the embedding model; each namespace gets its own FAISS index
             self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.index = faiss.IndexFlatL2(dimension)
-            self.metadata = []
+            # Repeated facts/queries are served from the on-disk embedding cache
+            self.embedder = EmbeddingCache(self.model, 'all-MiniLM-L6-v2')
             self.use_faiss = True
         else:
             # Fallback: simple in-memory storage (no embeddings)
-            self.documents = []
             self.use_faiss = False
 
-    def add_fact(self, text: str):
-        if not text or not text.strip():
-            return
+    def _entry_bytes(self, text: str) -> int:
+        vector_bytes = self.dimension * 4 if self.use_faiss else 0
+        return len(text.encode("utf-8")) + vector_bytes
 
-        if self.use_faiss:
-            embedding = self.model.encode([text]).astype('float32')
-            self.index.add(embedding)
-            self.metadata.append(text)
-        else:
-            self.documents.append(text)
+    def _touch(self, namespace: str, create: bool = False):
+        ns = self.namespaces.get(namespace)
+        if ns is None and create:
+            ns = self.namespaces[namespace] = _Namespace(self.dimension, self.use_faiss, self.metric)
+        if ns is not None:
+            ns.last_access = time.time()
+            self.namespaces.move_to_end(namespace)
+        return ns
 
-    def retrieve_relevant(self, query: str, k=3):
+    def _trim(self, ns: _Namespace, count: int):
+        """Drops the `count` oldest facts of a namespace."""
         if self.use_faiss:
-            if self.index.ntotal == 0:
+            ns.index.remove_oldest(count)
+        for doc_id in range(ns.base_id, ns.base_id + min(count, len(ns.documents))):
+            ns.lexical.remove(doc_id)
+        ns.base_id += min(count, len(ns.documents))
+        ns.bytes -= sum(self._entry_bytes(doc) for doc in ns.documents[:count])
+        del ns.documents[:count]
+        del ns.metadata[:count]
+
+    def _enforce_budget(self, active: str):
+        now = time.time()
+        if self.max_age:
+            for name in [n for n, ns in self.namespaces.items() if n != active and now - ns.last_access > self.max_age]:
+                del self.namespaces[name]
+
+        entries = sum(len(ns.documents) for ns in self.namespaces.values())
+        total = sum(ns.bytes for ns in self.namespaces.values())
+        for name in list(self.namespaces):
+            if entries <= self.max_entries and total <= self.max_bytes:
+                return
+            if name == active:
+                continue
+            ns = self.namespaces.pop(name)
+            entries -= len(ns.documents)
+            total -= ns.bytes
+            print(f"🧹 AgentMemory: Evicted namespace '{name}' ({len(ns.documents)} facts)")
+
+        # Only the active namespace is left and it alone is over budget
+        ns = self.namespaces.get(active)
+        while ns and ns.documents and (entries > self.max_entries or total > self.max_bytes):
+            count = max(1, entries - self.max_entries, len(ns.documents) // 10)
+            entries -= min(count, len(ns.documents))
+            self._trim(ns, count)
+            total = ns.bytes
+
+    def add_fact(self, text: str, namespace: str = DEFAULT_NAMESPACE):
+        return self.add_chunks([{"text": text}], namespace)
+
+    def add_chunks(self, chunks: list[dict], namespace: str = DEFAULT_NAMESPACE) -> int:
+        """
+        Stores chunk dicts ({"text": ..., plus any metadata such as "source"}).
+        Empty, exact-duplicate and near-duplicate chunks are skipped; the rest
+        are embedded in a single batch. Returns the number of chunks stored.
+        """
+        with self._lock:
+            ns = self._touch(namespace, create=True)
+            fresh = [
+                chunk for chunk in chunks
+                if chunk.get("text") and chunk["text"].strip() and not ns.dedup.is_duplicate(chunk["text"])
+            ]
+            if not fresh:
+                return 0
+
+            texts = [chunk["text"] for chunk in fresh]
+            if self.use_faiss:
+                ns.index.add(self.embedder.encode(texts))
+            for chunk in fresh:
+                text = chunk["text"]
+                ns.lexical.add(ns.base_id + len(ns.documents), text)
+                ns.documents.append(text)
+                ns.metadata.append({key: value for key, value in chunk.items() if key != "text"})
+                ns.bytes += self._entry_bytes(text)
+            skipped = len(chunks) - len(fresh)
+            if skipped:
+                print(f"🧬 AgentMemory: Skipped {skipped} duplicate chunk(s) in '{namespace}'")
+            self._enforce_budget(namespace)
+            return len(fresh)
+
+    def drop_namespace(self, namespace: str):
+        with self._lock:
+            self.namespaces.pop(namespace, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "namespaces": len(self.namespaces),
+                "entries": sum(len(ns.documents) for ns in self.namespaces.values()),
+                "bytes": sum(ns.bytes for ns in self.namespaces.values()),
+            }
+
+    def _dense_positions(self, ns: _Namespace, query: str, k: int) -> list[int]:
+        query_vec = self.embedder.encode([query])
+        distances, indices = ns.index.search(query_vec, k)
+        return [int(i) for i in indices[0] if i != -1]
+
+    def _lexical_positions(self, ns: _Namespace, query: str, k: int) -> list[int]:
+        return [doc_id - ns.base_id for _, doc_id in ns.lexical.search(query, k)]
+
+    def _fuse(self, rankings: list[tuple[list[int], float]], k: int) -> list[int]:
+        """Reciprocal rank fusion: sum of weight / (rrf_k + rank) across sources."""
+        scores = defaultdict(float)
+        for positions, weight in rankings:
+            for rank, position in enumerate(positions, start=1):
+                scores[position] += weight / (self.rrf_k + rank)
+        return sorted(scores, key=lambda p: (scores[p], p), reverse=True)[:k]
+
+    def retrieve_relevant(self, query: str, k=3, namespace: str = DEFAULT_NAMESPACE, mode: str = None,
+                          with_metadata: bool = False):
+        """
+        Top-k stored texts for `query`. With `with_metadata` each hit is a
+        dict of the text plus the source metadata it was stored with.
+        """
+        with self._lock:
+            positions = self._retrieve_positions(query, k, namespace, mode)
+            ns = self.namespaces.get(namespace)
+            if with_metadata:
+                return [{"text": ns.documents[p], **ns.metadata[p]} for p in positions]
+            return [ns.documents[p] for p in positions]
+
+    def _retrieve_positions(self, query: str, k: int, namespace: str, mode: str = None) -> list[int]:
+        mode = mode or self.retrieval_mode
+        if not self.use_faiss:
+            mode = "lexical"
+
+        with self._lock:
+            ns = self._touch(namespace)
+            if ns is None or not ns.documents:
                 return []
-            query_vec = self.model.encode([query]).astype('float32')
-            distances, indices = self.index.search(query_vec, k)
-            return [self.metadata[i] for i in indices[0] if i != -1]
-
-        # Fallback heuristic: keyword overlap + recency
-        if not self.documents:
-            return []
-
-        qwords = set(w.lower() for w in query.split() if w.strip())
-        scored = []
-        for doc in self.documents:
-            lc = doc.lower()
-            score = sum(1 for w in qwords if w in lc)
-            scored.append((score, doc))
-
-        # Prefer higher score, then earlier index (which keeps relative order)
-        scored.sort(key=lambda x: (x[0], self.documents.index(x[1])), reverse=True)
-        results = [d for s, d in scored if s > 0][:k]
-        if len(results) < k:
-            recent = list(reversed(self.documents))
-            for r in recent:
-                if r not in results:
-                    results.append(r)
-                if len(results) >= k:
-                    break
 
-        return results[:k]
\ No newline at end of file
+            if mode == "dense":
+                return self._dense_positions(ns, query, k)
+
+            if mode == "hybrid":
+                dense = _retrieval_pool.submit(self._dense_positions, ns, query, max(k, self.dense_k))
+                lexical = _retrieval_pool.submit(self._lexical_positions, ns, query, max(k, self.lexical_k))
+                return self._fuse(
+                    [(dense.result(), self.dense_weight), (lexical.result(), self.lexical_weight)], k
+                )
+
+            # Lexical only: BM25 over the inverted index, topped up with the most recent facts
+            positions = self._lexical_positions(ns, query, k)
+            seen = set(positions)
+            for position in range(len(ns.documents) - 1, -1, -1):
+                if len(positions) >= k:
+                    break
+                if position not in seen:
+                    positions.append(position)
+            return positions[:k]
@@ -0,0 +1,177 @@
+"""Per-stage model routing for LLMGateway calls.
+
+Each agent stage (planner, analysis, hypothesis, synthesis, chat, ...)
+is assigned a model tier through MODEL_ROUTES, so cheap structural steps
+run on the small model and the steps that shape report quality run on
+the large one. Every call is recorded per (stage, model): latency, error
+rate, tokens and cost. When a stage's moving-average latency goes over
+its budget (STAGE_LATENCY_BUDGETS) or its error rate over
+MODEL_ERROR_THRESHOLD, the stage is degraded to the next faster tier for
+MODEL_DEGRADE_COOLDOWN seconds; after that it probes its own tier again.
+"""
+
+import os
+import threading
+import time
+
+TIER_MODELS = {
+    "small": os.getenv("MODEL_TIER_SMALL", "llama-3.1-8b-instant"),
+    "large": os.getenv("MODEL_TIER_LARGE", "llama-3.3-70b-versatile"),
+}
+# Fallback order, slowest first
+TIER_ORDER = ["large", "small"]
+
+ERROR_THRESHOLD = float(os.getenv("MODEL_ERROR_THRESHOLD", "0.3"))
+DEGRADE_COOLDOWN = float(os.getenv("MODEL_DEGRADE_COOLDOWN", "300"))
+MIN_SAMPLES = int(os.getenv("MODEL_MIN_SAMPLES", "3"))
+# Weight of the newest call in the latency / error moving averages
+EWMA_ALPHA = 0.3
+
+# USD per million (input, output) tokens, Groq on-demand pricing
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.3-70b-specdec": (0.59, 0.99),
+}
+
+
+def _parse_map(spec: str, cast=str) -> dict:
+    """'planner=small,synthesis=large' -> {'planner': 'small', 'synthesis': 'large'}"""
+    mapping = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        try:
+            mapping[name.strip()] = cast(value.strip())
+        except ValueError:
+            print(f"WARNING: Ignoring invalid routing entry '{item}'")
+    return mapping
+
+
+STAGE_ROUTES = _parse_map(os.getenv(
+    "MODEL_ROUTES", "planner=small,analysis=small,hypothesis=large,synthesis=large,synthesis_map=small,briefing=large,chat=large"
+))
+# Seconds a stage's call may take on average before it is moved to a faster tier
+STAGE_LATENCY_BUDGETS = _parse_map(os.getenv(
+    "STAGE_LATENCY_BUDGETS", "planner=8,analysis=15,hypothesis=20,synthesis=45,synthesis_map=15,briefing=30,chat=15"
+), float)
+
+
+class _ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.ok_latency = 0.0
+        self.avg_latency = None
+        self.error_rate = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def add(self, model: str, latency: float, ok: bool, prompt_tokens: int, completion_tokens: int):
+        self.calls += 1
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if not ok:
+            self.errors += 1
+            return
+        self.ok_latency += latency
+        self.avg_latency = latency if self.avg_latency is None else (1 - EWMA_ALPHA) * self.avg_latency + EWMA_ALPHA * latency
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+        price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+        self.cost += ((prompt_tokens or 0) * price_in + (completion_tokens or 0) * price_out) / 1_000_000
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "avg_latency_s": round(self.avg_latency or 0.0, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_s": round(self.completion_tokens / self.ok_latency, 1) if self.ok_latency else 0.0,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+class ModelRouter:
+    def __init__(self, routes: dict = None, budgets: dict = None, tiers: dict = None,
+                 default_tier: str = "small", error_threshold: float = ERROR_THRESHOLD,
+                 cooldown: float = DEGRADE_COOLDOWN, min_samples: int = MIN_SAMPLES):
+        self.routes = routes if routes is not None else STAGE_ROUTES
+        self.budgets = budgets if budgets is not None else STAGE_LATENCY_BUDGETS
+        self.tiers = tiers or TIER_MODELS
+        self.default_tier = default_tier
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._degraded_until = {}
+        self.degradations = 0
+
+    def tier_for(self, stage: str) -> str:
+        return self.routes.get(stage or "default", self.default_tier)
+
+    def _faster_tier(self, tier: str):
+        i = TIER_ORDER.index(tier) if tier in TIER_ORDER else len(TIER_ORDER) - 1
+        return TIER_ORDER[i + 1] if i + 1 < len(TIER_ORDER) else None
+
+    def route(self, stage: str = None):
+        """Returns (model, fallback_model) for a stage; fallback is None on the fastest tier."""
+        stage = stage or "default"
+        tier = self.tier_for(stage)
+        with self._lock:
+            if self._degraded_until.get(stage, 0.0) > time.monotonic():
+                tier = self._faster_tier(tier) or tier
+        faster = self._faster_tier(tier)
+        return self.tiers[tier], self.tiers[faster] if faster else None
+
+    def record(self, stage: str, model: str, latency: float, ok: bool = True,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        stage = stage or "default"
+        with self._lock:
+            stats = self._stats.setdefault(stage, {}).setdefault(model, _ModelStats())
+            stats.add(model, latency, ok, prompt_tokens, completion_tokens)
+            # Only the stage's own tier can push it down; the fallback's numbers don't count
+            if model != self.tiers[self.tier_for(stage)] or stats.calls < self.min_samples:
+                return
+            budget = self.budgets.get(stage)
+            over_budget = budget is not None and stats.avg_latency is not None and stats.avg_latency > budget
+            if not (over_budget or stats.error_rate > self.error_threshold):
+                return
+            if self._faster_tier(self.tier_for(stage)) is None:
+                return
+            now = time.monotonic()
+            if self._degraded_until.get(stage, 0.0) > now:
+                return
+            self._degraded_until[stage] = now + self.cooldown
+            self.degradations += 1
+        reason = f"latency {stats.avg_latency:.1f}s > {budget}s" if over_budget else f"error rate {stats.error_rate:.0%}"
+        print(f"🔀 ModelRouter: '{stage}' on {model} ({reason}); using the faster tier for {self.cooldown:.0f}s")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            stages = {}
+            for stage, models in self._stats.items():
+                degraded = max(0.0, self._degraded_until.get(stage, 0.0) - now)
+                stages[stage] = {
+                    "tier": self.tier_for(stage),
+                    "budget_s": self.budgets.get(stage),
+                    "degraded_for_s": round(degraded, 1),
+                    "models": {model: s.to_dict() for model, s in models.items()},
+                }
+            return {"degradations": self.degradations, "stages": stages}
+
+
+_router = None
+
+
+def get_router() -> ModelRouter:
+    """Process-wide router shared by every LLMGateway call."""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
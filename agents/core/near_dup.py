@@ -0,0 +1,86 @@
+"""Exact and near-duplicate detection for chunks entering AgentMemory.
+
+Exact duplicates are caught by a hash of the whitespace/case-normalized
+text. Near duplicates (the same paragraph syndicated across sites, boiler-
+plate with a changed date) are caught with MinHash over word 3-gram
+shingles plus LSH banding, so each check only compares against the few
+chunks sharing a band rather than everything seen so far.
+"""
+
+import hashlib
+import os
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from agents.core.lexical_index import tokenize
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+
+# Mersenne prime 2^61-1; with a, b and the shingle hashes below 2^32, a*x + b fits in uint64
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    words = tokenize(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text)], dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (a*x + b) mod p for every permutation/shingle pair, min over shingles
+        permuted = (np.outer(hashes, self.a) + self.b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class NearDuplicateFilter:
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = 64, bands: int = 16):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.exact = set()
+        self.buckets = defaultdict(list)  # (band, band hash) -> signatures
+        self.stats = {"exact": 0, "near": 0, "kept": 0}
+
+    @staticmethod
+    def _exact_key(text: str) -> str:
+        return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def is_duplicate(self, text: str) -> bool:
+        """Checks `text` against everything seen so far and remembers it if new."""
+        key = self._exact_key(text)
+        if key in self.exact:
+            self.stats["exact"] += 1
+            return True
+
+        signature = self.hasher.signature(text)
+        band_keys = list(self._band_keys(signature))
+        for band_key in band_keys:
+            for other in self.buckets.get(band_key, ()):
+                if np.mean(signature == other) >= self.threshold:
+                    self.stats["near"] += 1
+                    return True
+
+        self.exact.add(key)
+        for band_key in band_keys:
+            self.buckets[band_key].append(signature)
+        self.stats["kept"] += 1
+        return False
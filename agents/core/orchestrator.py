@@ -1,83 +1,264 @@
 import asyncio
 import json
+import os
+import uuid
 # Direct import to ensure AgentMemory is found
 from agents.core.memory import AgentMemory
+from agents.core.chunking import chunk_search_results
+from agents.core.document_index import DocumentIndex, file_sha256
+
+# Max number of search→analysis chains allowed in flight at once per mission
+DEFAULT_MISSION_CONCURRENCY = int(os.getenv("MISSION_CONCURRENCY", "3"))
+
+
+def _agent_failed(text: str, stage: str) -> bool:
+    """Agents (and _search) report a failure as an "Error during <stage>: ..." text (or last delta)."""
+    return text.startswith(f"Error during {stage}")
+
 
 class ResearchOrchestrator:
-    def __init__(self):
+    def __init__(self, concurrency: int = DEFAULT_MISSION_CONCURRENCY):
         print("--- Initializing ResearchOrchestrator ---")
         self.memory = AgentMemory()
-        
+        self.concurrency = max(1, concurrency)
+        # Parsed uploads, sharing the memory's embedding model and cache
+        self.documents = DocumentIndex(embedder=self.memory.embedder if self.memory.use_faiss else None)
+
         # Initialize your logic agents
         from agents.logic.planner_agent import PlannerAgent
         from agents.logic.search_agent import SearchAgent
         from agents.logic.analysis_agent import AnalysisAgent
         from agents.logic.hypothesis_agent import HypothesisAgent
         from agents.logic.synthesis_agent import SynthesisAgent
-        
-        self.planner = PlannerAgent()
+
+        plan_cache = None
+        if self.memory.use_faiss:
+            from agents.core.plan_cache import PlanCache
+            plan_cache = PlanCache(self.memory.embedder, self.memory.dimension)
+        self.planner = PlannerAgent(plan_cache)
         self.searcher = SearchAgent()
         self.analyzer = AnalysisAgent()
         self.hypothesizer = HypothesisAgent()
         self.synthesizer = SynthesisAgent()
 
-    async def run_mission(self, topic: str, file_path: str = None):
+    async def _search(self, query: str):
+        """
+        Returns (result dicts, formatted text) for a query. The dicts feed
+        chunked memory ingestion; the text is what the Analysis Agent reads.
+        """
+        try:
+            hits = await asyncio.to_thread(self.searcher.fetch_results, query)
+            return hits, self.searcher.format_results(hits)
+        except Exception as e:
+            return [], f"Error during search: {str(e)}"
+
+    async def _remember(self, hits: list[dict], namespace: str):
+        """Chunks search hits into mission memory; embedding runs off the event loop."""
+        await asyncio.to_thread(self.memory.add_chunks, chunk_search_results(hits), namespace)
+
+    @staticmethod
+    async def _checkpoint(checkpoint, stage: str, value):
+        """Persists a finished stage so a retried mission can skip it."""
+        if checkpoint is None:
+            return
         try:
+            await asyncio.to_thread(checkpoint.save, stage, value)
+        except Exception as e:
+            print(f"Checkpoint '{stage}' failed: {e}")
+
+    @staticmethod
+    def _context_sources(chunks: list[dict]) -> list[dict]:
+        """Ranked memory hits as context packer sources, labelled with their origin."""
+        return [
+            {"text": f"[{chunk.get('title') or chunk.get('source') or 'memory'}] {chunk['text']}", "score": 1 / (i + 1)}
+            for i, chunk in enumerate(chunks)
+        ]
+
+    async def _run_query(self, index: int, query: str, semaphore: asyncio.Semaphore, events: asyncio.Queue,
+                         stream_analysis: bool = False, checkpoint=None):
+        """
+        Runs one search→analysis chain under the mission's concurrency limit.
+        Progress events are pushed onto the shared queue so the caller can
+        stream them in completion order.
+        """
+        async with semaphore:
+            await events.put({"agent": "Search", "status": "active", "msg": f"Searching: {query}", "index": index})
+            hits, raw_data = await self._search(query)
+
+            await events.put({"agent": "Analysis", "status": "active", "msg": f"Analyzing: {query}", "index": index})
+            if stream_analysis:
+                parts = []
+                async for delta in self.analyzer.analyze_results_stream(query, raw_data):
+                    parts.append(delta)
+                    await events.put({"type": "delta", "agent": "Analysis", "index": index, "content": delta})
+                analysis = "".join(parts)
+                failed = bool(parts) and _agent_failed(parts[-1], "analysis")
+            else:
+                analysis = await self.analyzer.analyze_results(query, raw_data)
+                failed = _agent_failed(analysis, "analysis")
+
+            # A failed search or analysis is redone by the next attempt, not resumed
+            if not (failed or _agent_failed(raw_data, "search")):
+                await self._checkpoint(checkpoint, f"query:{index}", {"query": query, "hits": hits, "analysis": analysis})
+            await events.put({"agent": "Analysis", "status": "done", "msg": f"Finished: {query}", "index": index})
+            return hits, analysis
+
+    async def _run_queries_concurrently(self, plan: list[str], raw_pool: list, results: list,
+                                        stream_analysis: bool = False, checkpoint=None):
+        """
+        Fans the plan out into parallel chains and yields their progress events
+        as they arrive. Search hits and analyses are written into `raw_pool`/`results` by plan
+        position, so report ordering does not depend on which chain finishes first.
+        Positions whose result is already filled in (resumed) are skipped.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        events = asyncio.Queue()
+        tasks = {
+            i: asyncio.create_task(self._run_query(i, query, semaphore, events, stream_analysis, checkpoint))
+            for i, query in enumerate(plan) if results[i] is None
+        }
+        try:
+            pending = set(tasks.values())
+            while pending:
+                getter = asyncio.create_task(events.get())
+                done, _ = await asyncio.wait(pending | {getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+                pending -= done
+
+            # Drain events queued by chains that finished in the same tick
+            while not events.empty():
+                yield events.get_nowait()
+
+            for i, task in tasks.items():
+                raw_pool[i], results[i] = task.result()
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+    async def run_mission(self, topic: str, file_path: str = None, concurrent: bool = True,
+                          stream: bool = True, stream_analysis: bool = False, mission_id: str = None,
+                          document_id: str = None, checkpoint=None):
+        """
+        Runs the full agent pipeline, yielding progress events. With `stream`
+        the report arrives as {"type": "delta"} events before the final
+        {"type": "complete"} event carrying the assembled text (with
+        "error": True if synthesis failed and the text is the error);
+        `stream_analysis` does the same for each sub-query analysis.
+        Facts are stored in the memory namespace `mission_id` (a fresh one
+        if omitted), so missions never retrieve each other's data.
+        An attached file is referenced by `document_id` (its SHA-256, see
+        DocumentIndex) or `file_path`; only its chunks relevant to the topic
+        reach the agents.
+        With a `checkpoint` (anything with load() -> {stage: value} and
+        save(stage, value)), the plan, each sub-query's search hits and
+        analysis, and the hypotheses are saved as they finish, and stages
+        already saved by an earlier attempt are reused instead of re-run.
+        """
+        namespace = mission_id or f"mission-{uuid.uuid4().hex}"
+        try:
+            saved = await asyncio.to_thread(checkpoint.load) if checkpoint is not None else {}
             file_context = ""
-            if file_path:
+            file_chunks = []
+            if file_path and not document_id:
+                document_id = await asyncio.to_thread(file_sha256, file_path)
+            if document_id:
                 yield {"agent": "Analyzer", "status": "active", "msg": "Reading attached file..."}
                 try:
-                    import os
-                    if os.path.exists(file_path):
-                        ext = file_path.lower().split('.')[-1]
-                        if ext == 'pdf':
-                            import PyPDF2
-                            with open(file_path, 'rb') as f:
-                                reader = PyPDF2.PdfReader(f)
-                                for page in reader.pages:
-                                    if page.extract_text():
-                                        file_context += page.extract_text() + "\n"
-                        elif ext in ['png', 'jpg', 'jpeg', 'webp']:
-                            try:
-                                import pytesseract
-                                from PIL import Image
-                                img = Image.open(file_path)
-                                file_context = pytesseract.image_to_string(img)
-                            except Exception as ocr_e:
-                                print(f"OCR Error: {ocr_e}")
-                                file_context = f"Failed to read image via OCR. Error: {ocr_e}"
-                        else:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                file_context = f.read()
-                        
-                        self.memory.add_fact(f"FILE CONTENT UPLOADED BY USER:\n{file_context[:5000]}") # Store in memory
+                    # Already parsed at upload time in the common case; otherwise parsed once here
+                    await asyncio.to_thread(self.documents.build, document_id, file_path)
+                    file_chunks = await asyncio.to_thread(self.documents.retrieve, document_id, topic, 4)
+                    file_context = "\n\n".join(chunk["text"] for chunk in file_chunks)
                 except Exception as e:
                     print(f"Failed to read file: {e}")
 
-            yield {"agent": "Planner", "status": "active", "msg": "Planning..."}
-            plan = await asyncio.to_thread(self.planner.generate_plan, topic, file_context)
-            await asyncio.sleep(0.5)
-
-            results = []
-            for query in plan:
-                yield {"agent": "Search", "status": "active", "msg": f"Searching: {query}"}
-                raw_data = await asyncio.to_thread(self.searcher.execute_search, query)
-                self.memory.add_fact(raw_data)
-                
-                yield {"agent": "Analysis", "status": "active", "msg": "Analyzing..."}
-                analysis = await asyncio.to_thread(self.analyzer.analyze_results, query, raw_data)
-                results.append(analysis)
-
-            yield {"agent": "Hypothesis", "status": "active", "msg": "Generating Hypothesis..."}
-            context = "\n".join(self.memory.retrieve_relevant(topic, k=3))
-            if file_context:
-                context = f"Uploaded File Data:\n{file_context[:3000]}\n\n{context}"
-                
-            hypotheses = await asyncio.to_thread(self.hypothesizer.generate_hypotheses, topic, context)
+            if "plan" in saved:
+                plan = saved["plan"]
+                yield {"agent": "Planner", "status": "done", "msg": "Resumed plan from checkpoint."}
+            else:
+                yield {"agent": "Planner", "status": "active", "msg": "Planning..."}
+                plan = await self.planner.generate_plan(topic, file_context)
+                await self._checkpoint(checkpoint, "plan", plan)
+
+            # Sub-queries finished by an earlier attempt of this mission
+            done = {
+                i: saved[f"query:{i}"] for i, query in enumerate(plan)
+                if saved.get(f"query:{i}", {}).get("query") == query
+            }
+            if done:
+                yield {"agent": "Search", "status": "done",
+                       "msg": f"Resumed {len(done)} of {len(plan)} sub-queries from checkpoint."}
+
+            if concurrent and len(plan) > 1:
+                raw_pool = [done[i]["hits"] if i in done else None for i in range(len(plan))]
+                results = [done[i]["analysis"] if i in done else None for i in range(len(plan))]
+                async for update in self._run_queries_concurrently(plan, raw_pool, results, stream_analysis, checkpoint):
+                    yield update
+                # Memory is fed in plan order once every chain is done
+                for hits in raw_pool:
+                    await self._remember(hits, namespace)
+            else:
+                results = []
+                for i, query in enumerate(plan):
+                    if i in done:
+                        await self._remember(done[i]["hits"], namespace)
+                        results.append(done[i]["analysis"])
+                        continue
+
+                    yield {"agent": "Search", "status": "active", "msg": f"Searching: {query}"}
+                    hits, raw_data = await self._search(query)
+                    await self._remember(hits, namespace)
+
+                    yield {"agent": "Analysis", "status": "active", "msg": "Analyzing..."}
+                    if stream_analysis:
+                        parts = []
+                        async for delta in self.analyzer.analyze_results_stream(query, raw_data):
+                            parts.append(delta)
+                            yield {"type": "delta", "agent": "Analysis", "index": len(results), "content": delta}
+                        analysis = "".join(parts)
+                        failed = bool(parts) and _agent_failed(parts[-1], "analysis")
+                    else:
+                        analysis = await self.analyzer.analyze_results(query, raw_data)
+                        failed = _agent_failed(analysis, "analysis")
+                    if not (failed or _agent_failed(raw_data, "search")):
+                        await self._checkpoint(checkpoint, f"query:{i}", {"query": query, "hits": hits, "analysis": analysis})
+                    results.append(analysis)
+
+            if "hypotheses" in saved:
+                hypotheses = saved["hypotheses"]
+                yield {"agent": "Hypothesis", "status": "done", "msg": "Resumed hypotheses from checkpoint."}
+            else:
+                yield {"agent": "Hypothesis", "status": "active", "msg": "Generating Hypothesis..."}
+                # Chunks are a few hundred words each, so pull more of them than whole results
+                # The file excerpts and memory hits share the hypothesis token budget
+                context = [{"text": f"[Uploaded File Data] {chunk['text']}"} for chunk in file_chunks]
+                memory_hits = await asyncio.to_thread(
+                    self.memory.retrieve_relevant, topic, k=6, namespace=namespace, with_metadata=True
+                )
+                context += self._context_sources(memory_hits)
+
+                hypotheses = await self.hypothesizer.generate_hypotheses(topic, context)
+                if not _agent_failed(hypotheses, "hypothesis"):
+                    await self._checkpoint(checkpoint, "hypotheses", hypotheses)
 
             yield {"agent": "Synthesis", "status": "active", "msg": "Synthesizing..."}
-            final_report = await asyncio.to_thread(self.synthesizer.synthesize, topic, results + [hypotheses])
+            if stream:
+                parts = []
+                async for delta in self.synthesizer.synthesize_stream(topic, results + [hypotheses]):
+                    parts.append(delta)
+                    yield {"type": "delta", "agent": "Synthesis", "content": delta}
+                final_report = "".join(parts)
+                failed = bool(parts) and _agent_failed(parts[-1], "synthesis")
+            else:
+                final_report = await self.synthesizer.synthesize(topic, results + [hypotheses])
+                failed = _agent_failed(final_report, "synthesis")
 
-            yield {"type": "complete", "content": final_report}
+            if failed:
+                yield {"type": "complete", "content": final_report, "error": True}
+            else:
+                yield {"type": "complete", "content": final_report}
         except Exception as e:
-            yield {"type": "error", "msg": str(e)}
\ No newline at end of file
+            yield {"type": "error", "msg": str(e)}
@@ -0,0 +1,91 @@
+"""Semantic cache for PlannerAgent output.
+
+Topics are embedded with the memory's embedding model and kept in a cosine
+AdaptiveIndex next to the plan generated for them. A new topic whose
+nearest cached topic is at least PLAN_CACHE_THRESHOLD similar reuses that
+plan, so "raman effect" and "the Raman effect explained" cost one planner
+call between them. Every lookup logs its best similarity, hit or miss, so
+the threshold can be tuned from the logs. Entries expire after
+PLAN_CACHE_TTL seconds; past PLAN_CACHE_MAX_ENTRIES the oldest are dropped.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from agents.core.ann_index import AdaptiveIndex
+
+PLAN_CACHE_THRESHOLD = float(os.getenv("PLAN_CACHE_THRESHOLD", "0.85"))
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", str(24 * 3600)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "2000"))
+
+
+class PlanCache:
+    def __init__(self, embedder, dimension: int, threshold: float = PLAN_CACHE_THRESHOLD,
+                 ttl: float = PLAN_CACHE_TTL, max_entries: int = PLAN_CACHE_MAX_ENTRIES):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index = AdaptiveIndex(dimension, metric="cosine")
+        # (stored_at, topic, plan), in index order (oldest first)
+        self._entries = deque()
+        # Embedding and search run in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_similarity = 0.0
+
+    def _expire(self):
+        now = time.time()
+        stale = 0
+        while stale < len(self._entries) and now - self._entries[stale][0] >= self.ttl:
+            stale += 1
+        overflow = len(self._entries) - stale - self.max_entries
+        count = stale + max(0, overflow)
+        if count:
+            self.index.remove_oldest(count)
+            for _ in range(count):
+                self._entries.popleft()
+
+    def get(self, topic: str):
+        """Returns the plan of the most similar cached topic above the threshold, or None."""
+        vector = self.embedder.encode([topic])
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                print(f"🗺️ PlanCache: MISS for '{topic}' (cache empty)")
+                return None
+            scores, ids = self.index.search(vector, 1)
+            similarity, position = float(scores[0][0]), int(ids[0][0])
+            if position < 0 or similarity < self.threshold:
+                self.misses += 1
+                nearest = self._entries[position][1] if position >= 0 else None
+                print(f"🗺️ PlanCache: MISS for '{topic}' (best {similarity:.3f} '{nearest}' < {self.threshold})")
+                return None
+            self.hits += 1
+            self._hit_similarity += similarity
+            _, cached_topic, plan = self._entries[position]
+        print(f"🗺️ PlanCache: HIT for '{topic}' (similarity {similarity:.3f} to '{cached_topic}')")
+        return list(plan)
+
+    def set(self, topic: str, plan: list[str]):
+        vector = self.embedder.encode([topic])
+        with self._lock:
+            self.index.add(vector)
+            self._entries.append((time.time(), topic, list(plan)))
+            self._expire()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "avg_hit_similarity": round(self._hit_similarity / self.hits, 3) if self.hits else 0.0,
+                "threshold": self.threshold,
+            }
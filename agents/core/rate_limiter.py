@@ -0,0 +1,176 @@
+"""Process-wide rate limiting for upstream APIs (Groq, Tavily).
+
+Each upstream gets one `RateLimiter` (see `get_limiter`) shared by every
+agent, thread and concurrent mission. It holds two token buckets, one for
+requests per minute and one for tokens per minute, and callers reserve
+capacity before each call: the reservation returns how long to wait, so
+the same limiter works from async code (`acquire`) and from worker threads
+(`acquire_sync`) without being tied to an event loop.
+
+When an upstream still answers 429, `backoff_delay` gives a jittered
+exponential delay (or the server's Retry-After) and `penalize` pauses the
+whole limiter for that long, so other callers back off too instead of
+piling more requests onto an exhausted quota.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "1.0"))
+BACKOFF_CAP = float(os.getenv("RATE_LIMIT_BACKOFF_CAP", "60"))
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes `amount` (possibly going into debt); returns seconds until it is covered."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    def __init__(self, name: str, rpm: float = None, tpm: float = None):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            self.calls += 1
+            if delay > 0:
+                self.waited += 1
+                self.total_wait += delay
+                self.max_wait = max(self.max_wait, delay)
+            return delay
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Waits (without blocking the loop) until a call costing `tokens` may go out."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def acquire_sync(self, tokens: int = 0) -> float:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def settle(self, estimated: int, actual: int):
+        """Corrects the token bucket once the real usage of a call is known."""
+        if self.tokens is None or actual is None:
+            return
+        with self._lock:
+            if actual < estimated:
+                self.tokens.refund(estimated - actual)
+            else:
+                self.tokens.reserve(actual - estimated, time.monotonic())
+
+    def penalize(self, delay: float):
+        """Pauses every caller of this upstream for `delay` seconds (after a 429)."""
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "waited": self.waited,
+                "throttled": self.throttled,
+                "avg_wait_s": round(self.total_wait / self.calls, 3) if self.calls else 0.0,
+                "max_wait_s": round(self.max_wait, 3),
+            }
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or type(exc).__name__ in ("RateLimitError", "UsageLimitExceededError")
+
+
+def was_rejected(exc: Exception) -> bool:
+    """
+    True if the upstream provably did no work for the failed call: it answered
+    429, or the connection was never established. Timeouts, dropped
+    connections and 5xx may come after the request was processed.
+    """
+    if is_rate_limited(exc):
+        return True
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if type(exc).__name__ in ("ConnectError", "ConnectTimeout"):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def retry_after(exc: Exception):
+    """Seconds from the response's Retry-After header, if the exception carries one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, server_delay: float = None) -> float:
+    """Retry-After plus a little jitter, else full-jitter exponential backoff."""
+    if server_delay is not None:
+        return server_delay + random.uniform(0, 0.1 * server_delay + 0.1)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Defaults match the Groq free tier and Tavily's per-minute limit
+_DEFAULT_LIMITS = {
+    "groq": ("GROQ_RPM", "30", "GROQ_TPM", "6000"),
+    "tavily": ("TAVILY_RPM", "100", None, None),
+}
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """Returns the process-wide limiter for an upstream ("groq", "tavily")."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rpm_env, rpm_default, tpm_env, tpm_default = _DEFAULT_LIMITS.get(name, (None, None, None, None))
+            rpm = float(os.getenv(rpm_env, rpm_default)) if rpm_env else None
+            tpm = float(os.getenv(tpm_env, tpm_default)) if tpm_env else None
+            limiter = _limiters[name] = RateLimiter(name, rpm, tpm)
+        return limiter
+
+
+def limiter_stats() -> dict:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
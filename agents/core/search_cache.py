@@ -0,0 +1,74 @@
+"""In-process TTL cache for structured web search results.
+
+Queries are keyed on a normalized form (case, whitespace and punctuation
+folded), so "GT 650?" and "gt  650" share one entry. Callers can tighten
+freshness per lookup with `max_age`, independent of the cache-wide TTL.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query and folds punctuation and runs of whitespace."""
+    query = _NON_WORD.sub(" ", (query or "").lower())
+    return _SPACES.sub(" ", query).strip()
+
+
+class SearchCache:
+    def __init__(
+        self,
+        ttl: float = float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+        max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512")),
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, results)
+        # execute_search runs in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, **options) -> tuple:
+        return (normalize_query(query),) + tuple(sorted(options.items()))
+
+    def get(self, key: tuple, max_age: float = None):
+        """
+        Returns cached results younger than both the TTL and `max_age`
+        (seconds), or None. `max_age=0` always misses.
+        """
+        limit = self.ttl if max_age is None else min(self.ttl, max_age)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= limit:
+                if entry is not None and time.time() - entry[0] >= self.ttl:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: tuple, results: list):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
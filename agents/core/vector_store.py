@@ -1,18 +1,137 @@
 import faiss
+import glob
+import json
+import mmap as _mmap
 import numpy as np
 import os
 from sentence_transformers import SentenceTransformer
+from agents.core.embedding_cache import EmbeddingCache
+from agents.core.ann_index import AdaptiveIndex, apply_search_params, build_index, target_kind, IVF_THRESHOLD, NPROBE, EF_SEARCH
+
+# Zero-copy mapping of flat index codes where the FAISS build supports it
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+# Past this many segments, save() merges them all into one index
+MAX_SEGMENTS = int(os.getenv("VECTOR_STORE_MAX_SEGMENTS", "8"))
+
+
+def _segment_vectors(index) -> np.ndarray:
+    """All vectors of a saved segment (exact for flat, IVF-Flat, HNSW and refined IVF-PQ)."""
+    try:
+        # IVF lists need a direct map before vectors can be looked up by id
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
+
+
+class DocumentStore:
+    """
+    Append-only text store backing VectorStore.documents.
+
+    On disk it is `docs.bin` (UTF-8 texts back to back) plus `docs.idx`
+    (one uint64 end offset per document). Saved documents are read through
+    memory maps; documents added since the last flush live in a Python list.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self._offsets = np.empty(0, dtype=np.uint64)
+        self._data = b""
+        self._pending = []
+
+    def _paths(self, directory: str):
+        return os.path.join(directory, "docs.bin"), os.path.join(directory, "docs.idx")
+
+    def map(self, directory: str, limit: int = None, use_mmap: bool = True):
+        """Maps the store saved in `directory`, optionally ignoring documents past `limit`."""
+        data_path, idx_path = self._paths(directory)
+        self.directory = directory
+        self._pending = []
+        count = os.path.getsize(idx_path) // 8 if os.path.exists(idx_path) else 0
+        if limit is not None:
+            count = min(count, limit)
+        if count == 0:
+            self._offsets = np.empty(0, dtype=np.uint64)
+            self._data = b""
+            return
+
+        if use_mmap:
+            self._offsets = np.memmap(idx_path, dtype=np.uint64, mode="r", shape=(count,))
+            with open(data_path, "rb") as f:
+                self._data = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        else:
+            self._offsets = np.fromfile(idx_path, dtype=np.uint64, count=count)
+            with open(data_path, "rb") as f:
+                self._data = f.read(int(self._offsets[-1]))
+
+    def __len__(self):
+        return len(self._offsets) + len(self._pending)
+
+    def __getitem__(self, i: int) -> str:
+        mapped = len(self._offsets)
+        if i < 0:
+            i += len(self)
+        if i >= mapped:
+            return self._pending[i - mapped]
+        start = int(self._offsets[i - 1]) if i else 0
+        return self._data[start:int(self._offsets[i])].decode("utf-8")
+
+    def extend(self, texts: list[str]):
+        self._pending.extend(texts)
+
+    def flush(self, directory: str):
+        """
+        Appends pending documents to the files in `directory`. When the store
+        is bound to another directory everything is written out first.
+        """
+        data_path, idx_path = self._paths(directory)
+        if directory != self.directory:
+            texts = [self[i] for i in range(len(self))]
+            for path in (data_path, idx_path):
+                open(path, "wb").close()
+            self._offsets = np.empty(0, dtype=np.uint64)
+            self._pending = texts
+
+        mapped = len(self._offsets)
+        end = int(self._offsets[-1]) if mapped else 0
+        encoded = [t.encode("utf-8") for t in self._pending]
+        offsets = end + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+        # Drop any tail written by an interrupted save before appending
+        with open(data_path, "r+b" if os.path.exists(data_path) else "wb") as f:
+            f.truncate(end)
+            f.seek(end)
+            f.write(b"".join(encoded))
+        with open(idx_path, "r+b" if os.path.exists(idx_path) else "wb") as f:
+            f.truncate(mapped * 8)
+            f.seek(mapped * 8)
+            f.write(offsets.astype(np.uint64).tobytes())
+        self.map(directory)
+
 
 class VectorStore:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', metric: str = "l2"):
         """
         Initializes the VectorStore with a pre-trained embedding model.
         Default: all-MiniLM-L6-v2 (fast and efficient for local use).
+        metric: "l2" (Euclidean) or "cosine" (inner product on normalized vectors).
         """
         print(f"Initializing VectorStore with model: {model_name}...")
         self.model = SentenceTransformer(model_name)
+        # Texts embedded before (by any store or worker) are not re-encoded
+        self.embedder = EmbeddingCache(self.model, model_name)
+        # Saved, read-only index segments (memory-mapped after load) and their file names ...
+        self.segments = []
+        self.segment_names = []
+        # ... plus the live index holding vectors added since the last save
         self.index = None
-        self.documents = []
+        self.documents = DocumentStore()
+        self.path = None
+        self.metric = metric
+        self.nprobe = NPROBE
+        self.ef_search = EF_SEARCH
+
+    def _segment_total(self):
+        return sum(segment.ntotal for segment in self.segments)
 
     def add_texts(self, texts: list[str]):
         """
@@ -22,15 +141,15 @@ class VectorStore:
             return
 
         self.documents.extend(texts)
-        # Convert text to numerical vectors
-        embeddings = self.model.encode(texts)
-        
+        # Convert text to numerical vectors (cache misses are encoded in one batch)
+        embeddings = self.embedder.encode(texts)
+
         # Initialize the FAISS index if this is the first time adding data
         if self.index is None:
             dimension = embeddings.shape[1]
-            # IndexFlatL2 uses Euclidean distance for similarity search
-            self.index = faiss.IndexFlatL2(dimension)
-        
+            # Starts as an exact flat index and switches to IVF/HNSW/PQ as it grows
+            self.index = AdaptiveIndex(dimension, metric=self.metric, nprobe=self.nprobe, ef_search=self.ef_search)
+
         # FAISS requires float32 numpy arrays
         self.index.add(np.array(embeddings).astype('float32'))
         print(f"Added {len(texts)} chunks to the vector store.")
@@ -39,20 +158,146 @@ class VectorStore:
         """
         Searches the index for the top 'k' most relevant snippets for a given query.
         """
-        if self.index is None or not self.documents:
+        if (self.index is None and not self.segments) or not len(self.documents):
             print("Vector store is empty. No search performed.")
             return []
-        
+
         # Convert the user query into the same vector space
-        query_vector = self.model.encode([query])
-        
-        # Search for the nearest neighbors
-        distances, indices = self.index.search(np.array(query_vector).astype('float32'), k)
-        
+        query_vector = np.array(self.embedder.encode([query])).astype('float32')
+        if self.metric == "cosine":
+            faiss.normalize_L2(query_vector)
+
+        # Search every segment for its nearest neighbors, then keep the global top k
+        hits = []
+        offset = 0
+        for index in self.segments + ([self.index] if self.index is not None else []):
+            if index.ntotal:
+                distances, indices = index.search(query_vector, min(k, index.ntotal))
+                hits.extend((d, offset + i) for d, i in zip(distances[0], indices[0]) if i != -1)
+            offset += index.ntotal
+        # L2 distances: smaller is closer; cosine similarities: larger is closer
+        hits.sort(reverse=self.metric == "cosine")
+
         # Retrieve the original text snippets based on the indices found
-        results = [self.documents[i] for i in indices[0] if i != -1]
+        results = [self.documents[i] for _, i in hits[:k]]
         return results
 
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        """Tunes the recall/latency trade-off of IVF (nprobe) and HNSW (efSearch) indexes."""
+        self.nprobe = nprobe or self.nprobe
+        self.ef_search = ef_search or self.ef_search
+        for segment in self.segments:
+            apply_search_params(segment, self.nprobe, self.ef_search)
+        if self.index is not None:
+            self.index.set_search_params(self.nprobe, self.ef_search)
+
+    def save(self, path: str):
+        """
+        Persists the store to directory `path`. Saving again to the same
+        directory only appends: new documents go to the end of the document
+        files and new vectors become one more index segment file.
+        Segments are then compacted (see _compact) so the corpus does not
+        end up as many small flat scans. store.json lists the live segment
+        files and is replaced atomically, so a crash mid-save or mid-merge
+        leaves the previous consistent set in place.
+        """
+        os.makedirs(path, exist_ok=True)
+        stale = []
+        if path != self.path:
+            # First save to this directory: write every segment out
+            stale = glob.glob(os.path.join(path, "segment-*.faiss"))
+            segments = self.segments
+            self.segments, self.segment_names = [], []
+            for index in segments:
+                self._write_segment(path, index)
+
+        # Documents first: on load, documents beyond the saved vectors are ignored
+        self.documents.flush(path)
+        if self.index is not None and self.index.ntotal:
+            self._write_segment(path, self.index.index)
+            self.index = None
+        stale += self._compact(path)
+        self._write_manifest(path)
+        for name in stale:
+            if os.path.basename(name) not in self.segment_names and os.path.exists(name):
+                try:
+                    os.remove(name)
+                except OSError as e:
+                    # Still mapped (Windows); unlisted files are ignored on load
+                    print(f"Could not remove old segment {name}: {e}")
+        self.path = path
+        print(f"Saved {len(self.documents)} chunks to {path}.")
+
+    def _compact(self, path: str) -> list[str]:
+        """
+        Merges segments so index thresholds apply to the corpus as a whole:
+        the trailing run of flat segments is merged once it reaches the IVF
+        threshold (the merged segment then gets the kind its size calls
+        for), and everything is merged once there are more than
+        MAX_SEGMENTS. Returns the files that were replaced.
+        """
+        start = len(self.segments)
+        while start > 0 and isinstance(self.segments[start - 1], faiss.IndexFlat):
+            start -= 1
+        flat_run = self.segments[start:]
+        if len(self.segments) > MAX_SEGMENTS:
+            start = 0
+        elif len(flat_run) < 2 or sum(s.ntotal for s in flat_run) < IVF_THRESHOLD:
+            return []
+
+        run = self.segments[start:]
+        vectors = np.vstack([_segment_vectors(segment) for segment in run])
+        kind = target_kind(len(vectors))
+        print(f"🧭 VectorStore: Merging {len(run)} segments ({len(vectors)} vectors) into one {kind} segment...")
+        merged = build_index(kind, vectors.shape[1], vectors, self.metric)
+        apply_search_params(merged, self.nprobe, self.ef_search)
+        replaced = [os.path.join(path, name) for name in self.segment_names[start:]]
+        del self.segments[start:], self.segment_names[start:]
+        self._write_segment(path, merged)
+        return replaced
+
+    def _write_manifest(self, path: str):
+        name = os.path.join(path, "store.json")
+        with open(name + ".tmp", "w") as f:
+            json.dump({"metric": self.metric, "segments": self.segment_names}, f)
+        os.replace(name + ".tmp", name)
+
+    def _write_segment(self, path: str, index):
+        # Never reuse a file name, so a listed segment is never overwritten in place
+        existing = [int(os.path.basename(n)[8:13]) for n in glob.glob(os.path.join(path, "segment-*.faiss"))]
+        name = f"segment-{max(existing, default=-1) + 1:05d}.faiss"
+        faiss.write_index(index, os.path.join(path, name + ".tmp"))
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+        self.segments.append(index)
+        self.segment_names.append(name)
+
+    def load(self, path: str, mmap: bool = True):
+        """
+        Loads a store written by save(). With `mmap` the index segments and
+        the document files are memory-mapped instead of read into memory,
+        so start-up cost does not grow with corpus size.
+        """
+        flags = _MMAP_FLAGS if mmap else 0
+        meta_path = os.path.join(path, "store.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        self.metric = meta.get("metric", self.metric)
+        # Stores saved before store.json listed its segments use every segment file
+        self.segment_names = meta.get("segments") or sorted(
+            os.path.basename(name) for name in glob.glob(os.path.join(path, "segment-*.faiss"))
+        )
+        self.segments = [faiss.read_index(os.path.join(path, name), flags) for name in self.segment_names]
+        for segment in self.segments:
+            apply_search_params(segment, self.nprobe, self.ef_search)
+        self.index = None
+        self.documents = DocumentStore()
+        self.documents.map(path, limit=self._segment_total(), use_mmap=mmap)
+        self.path = path
+        print(f"Loaded {len(self.documents)} chunks from {path}.")
+        return self
+
 # Self-test logic
 if __name__ == "__main__":
     store = VectorStore()
@@ -62,9 +307,9 @@ if __name__ == "__main__":
         "Bangalore is a major tech hub in India known for its startup ecosystem."
     ]
     store.add_texts(sample_data)
-    
+
     query = "Where do tech startups thrive in India?"
     matches = store.search(query, k=1)
-    
+
     print(f"\nQuery: {query}")
-    print(f"Top Result: {matches[0] if matches else 'No match found.'}")
\ No newline at end of file
+    print(f"Top Result: {matches[0] if matches else 'No match found.'}")
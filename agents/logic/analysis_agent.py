@@ -1,5 +1,6 @@
 import os
-from agents.core.llm_client import GroqClient
+from agents.core.context_packer import pack
+from agents.core.llm_client import get_gateway
 from dotenv import load_dotenv
 
 # Load keys
@@ -8,10 +9,10 @@ load_dotenv()
 class AnalysisAgent:
     def __init__(self):
         """
-        Initializes the AnalysisAgent with a Groq LLM client.
+        Initializes the AnalysisAgent on the shared Groq LLM gateway.
         This agent is responsible for reasoning over raw search data.
         """
-        self.llm = GroqClient()
+        self.llm = get_gateway()
         self.system_prompt = (
             "You are the Analysis Agent for ResearchPilot AI. Your goal is to process raw "
             "search results and extract high-quality, factual insights. \n\n"
@@ -22,27 +23,47 @@ class AnalysisAgent:
             "4. Cite sources (URLs) next to the facts you extract."
         )
 
-    def analyze_results(self, research_topic: str, raw_data: str):
-        """
-        Takes raw search data and synthesizes it into a structured analysis.
-        """
-        print(f"🧠 AnalysisAgent: Processing data for '{research_topic}'...")
-        
-        prompt = (
+    def _build_prompt(self, research_topic: str, raw_data: str):
+        # Results arrive best-first, so earlier ones get a larger share of the budget
+        results = raw_data.split("\n---\n")
+        raw_data = pack([{"text": r, "score": 1 / (i + 1)} for i, r in enumerate(results)], "analysis", separator="\n---\n")
+        return (
             f"Research Topic: {research_topic}\n\n"
             f"Raw Search Data:\n{raw_data}\n\n"
             "Please provide a detailed analysis of the above data. "
             "Identify major breakthroughs, key players, and any technical limitations mentioned."
         )
 
+    async def analyze_results(self, research_topic: str, raw_data: str):
+        """
+        Takes raw search data and synthesizes it into a structured analysis.
+        """
+        print(f"🧠 AnalysisAgent: Processing data for '{research_topic}'...")
+        prompt = self._build_prompt(research_topic, raw_data)
+
         try:
-            analysis = self.llm.generate(prompt, system_message=self.system_prompt)
+            analysis = await self.llm.generate(prompt, system_message=self.system_prompt, stage="analysis")
             return analysis
         except Exception as e:
             return f"Error during analysis: {str(e)}"
 
+    async def analyze_results_stream(self, research_topic: str, raw_data: str):
+        """
+        Same as analyze_results(), but yields the analysis token by token.
+        """
+        print(f"🧠 AnalysisAgent: Streaming analysis for '{research_topic}'...")
+        prompt = self._build_prompt(research_topic, raw_data)
+
+        try:
+            async for delta in self.llm.stream(prompt, system_message=self.system_prompt, stage="analysis"):
+                yield delta
+        except Exception as e:
+            yield f"Error during analysis: {str(e)}"
+
 # Test Logic
 if __name__ == "__main__":
+    import asyncio
+
     analyzer = AnalysisAgent()
     
     # Dummy data for testing
@@ -53,6 +74,6 @@ if __name__ == "__main__":
         "capable of managing entire software development lifecycles."
     )
     
-    report = analyzer.analyze_results(topic, mock_data)
+    report = asyncio.run(analyzer.analyze_results(topic, mock_data))
     print("\n--- ANALYSIS REPORT ---")
     print(report)
\ No newline at end of file
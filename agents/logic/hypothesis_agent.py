@@ -1,4 +1,5 @@
-from agents.core.llm_client import GroqClient
+from agents.core.context_packer import pack
+from agents.core.llm_client import get_gateway
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,7 +10,7 @@ class HypothesisAgent:
         Initializes the HypothesisAgent. 
         Its role is to generate testable and novel scientific propositions.
         """
-        self.llm = GroqClient()
+        self.llm = get_gateway()
         self.system_prompt = (
             "You are the Lead Scientist for ResearchPilot AI. "
             "Your goal is to generate NOVEL and TESTABLE hypotheses based on research data. \n\n"
@@ -20,9 +21,15 @@ class HypothesisAgent:
             "4. Focus on 'XOR' discoveries—find gaps or contradictions in the data."
         )
 
-    def generate_hypotheses(self, topic: str, analyzed_data: str):
+    async def generate_hypotheses(self, topic: str, analyzed_data):
+        """
+        `analyzed_data` is a string or a list of context sources (strings or
+        {"text", "score"} dicts) packed into the hypothesis token budget.
+        """
         print(f"🔬 HypothesisAgent: Ideating new theories for '{topic}'...")
-        
+        sources = analyzed_data if isinstance(analyzed_data, list) else [analyzed_data]
+        analyzed_data = pack(sources, "hypothesis")
+
         prompt = (
             f"Topic: {topic}\n\n"
             f"Current Knowledge/Analysis:\n{analyzed_data}\n\n"
@@ -31,6 +38,6 @@ class HypothesisAgent:
         )
 
         try:
-            return self.llm.generate(prompt, system_message=self.system_prompt)
+            return await self.llm.generate(prompt, system_message=self.system_prompt, stage="hypothesis")
         except Exception as e:
             return f"Error during hypothesis generation: {str(e)}"
\ No newline at end of file
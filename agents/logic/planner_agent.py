@@ -1,24 +1,38 @@
+import asyncio
 import json
-from agents.core.llm_client import GroqClient
+from agents.core.context_packer import pack
+from agents.core.llm_client import get_gateway
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class PlannerAgent:
-    def __init__(self):
-        self.llm = GroqClient()
+    def __init__(self, plan_cache=None):
+        self.llm = get_gateway()
+        # Optional PlanCache: plans for semantically similar topics are reused
+        self.plan_cache = plan_cache
         self.system_prompt = (
             "You are the Strategic Planner for ResearchPilot AI. "
             "Your job is to break down a complex research topic into 3 distinct, "
             "searchable sub-queries. Output ONLY a valid Python-style list of strings."
         )
 
-    def generate_plan(self, topic: str, file_context: str = ""):
+    async def generate_plan(self, topic: str, file_context: str = ""):
         print(f"📋 PlannerAgent: Breaking down '{topic}' into sub-tasks...")
-        
+        # Plans informed by an attached file are specific to it, so only topic-only plans are cached
+        use_cache = self.plan_cache is not None and not file_context
+        if use_cache:
+            try:
+                plan = await asyncio.to_thread(self.plan_cache.get, topic)
+                if plan is not None:
+                    return plan
+            except Exception as e:
+                print(f"Plan cache lookup failed: {e}")
+                use_cache = False
+
         prompt = f"Topic: {topic}\n\n"
         if file_context:
-            prompt += f"Attached File Context (use this to inform your searches):\n{file_context[:2000]}\n\n"
+            prompt += f"Attached File Context (use this to inform your searches):\n{pack([file_context], 'planner')}\n\n"
             prompt += "Based on the topic AND the attached file context, create 3 highly specific search queries that investigate the topic in light of the provided file data. "
         else:
             prompt += "Create 3 specific search queries that cover different angles of this topic. "
@@ -28,7 +42,7 @@ class PlannerAgent:
             "'Global EV market share 2026', and 'EV charging infrastructure challenges'."
         )
 
-        response = self.llm.generate(prompt, system_message=self.system_prompt)
+        response = await self.llm.generate(prompt, system_message=self.system_prompt, stage="planner")
         
         # Simple cleanup to ensure we get a list
         try:
@@ -36,11 +50,19 @@ class PlannerAgent:
             start = response.find('[')
             end = response.rfind(']') + 1
             plan = eval(response[start:end])
-            return plan
         except:
             # Fallback if eval fails
             return [f"{topic} overview", f"{topic} latest developments", f"{topic} future outlook"]
 
+        if use_cache and isinstance(plan, list) and plan:
+            try:
+                await asyncio.to_thread(self.plan_cache.set, topic, plan)
+            except Exception as e:
+                print(f"Plan cache update failed: {e}")
+        return plan
+
 if __name__ == "__main__":
+    import asyncio
+
     planner = PlannerAgent()
-    print(planner.generate_plan("The impact of Agentic AI on Software Engineering"))
\ No newline at end of file
+    print(asyncio.run(planner.generate_plan("The impact of Agentic AI on Software Engineering")))
\ No newline at end of file
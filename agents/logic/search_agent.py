@@ -1,12 +1,17 @@
 import os
 from tavily import TavilyClient
 from dotenv import load_dotenv
+from agents.core.search_cache import SearchCache
+from agents.core.rate_limiter import SEARCH_MAX_RETRIES, backoff_delay, get_limiter, is_rate_limited, retry_after
 
 # Load keys from the .env file (which is now safely ignored by git)
 load_dotenv()
 
+# Shared by every SearchAgent in the process so concurrent missions reuse results
+_search_cache = SearchCache()
+
 class SearchAgent:
-    def __init__(self):
+    def __init__(self, cache: SearchCache = None):
         """
         Initializes the SearchAgent with the Tavily API client.
         Tavily is optimized for LLM agents to find high-quality research data.
@@ -16,32 +21,65 @@ class SearchAgent:
             raise ValueError("TAVILY_API_KEY not found in .env. Please get one at tavily.com")
         
         self.client = TavilyClient(api_key=self.api_key)
+        self.cache = cache or _search_cache
+        # Shared with every other SearchAgent / mission in the process
+        self.limiter = get_limiter("tavily")
 
-    def execute_search(self, query: str, max_results: int = 5):
+    def fetch_results(self, query: str, max_results: int = 5, max_age: float = None):
         """
-        Conducts an advanced search and returns structured context for the Analysis Agent.
+        Returns the raw Tavily result dicts for a query, served from the search
+        cache when a fresh enough entry exists. `max_age` (seconds) overrides
+        the cache TTL for this call; 0 forces a live search.
         """
+        key = self.cache.make_key(query, max_results=max_results, depth="advanced")
+        results = self.cache.get(key, max_age=max_age)
+        if results is not None:
+            print(f"♻️ SearchAgent: Cache hit for '{query}'")
+            return results
+
         print(f"🔍 SearchAgent: Investigating '{query}'...")
-        
-        try:
-            # search_depth="advanced" retrieves more context/snippets from each page
-            response = self.client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=max_results
+        for attempt in range(SEARCH_MAX_RETRIES + 1):
+            self.limiter.acquire_sync()
+            try:
+                # search_depth="advanced" retrieves more context/snippets from each page
+                response = self.client.search(
+                    query=query,
+                    search_depth="advanced",
+                    max_results=max_results
+                )
+                break
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == SEARCH_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, retry_after(e))
+                self.limiter.penalize(delay)
+                print(f"⏳ SearchAgent: Tavily rate limit hit, backing off {delay:.1f}s (attempt {attempt + 1})")
+        results = response.get('results', [])
+        self.cache.set(key, results)
+        return results
+
+    @staticmethod
+    def format_results(results: list[dict]):
+        """
+        Renders result dicts into the SOURCE/TITLE/CONTENT blocks the Analysis Agent expects.
+        """
+        formatted_results = []
+        for result in results:
+            content_block = (
+                f"SOURCE: {result.get('url')}\n"
+                f"TITLE: {result.get('title')}\n"
+                f"CONTENT: {result.get('content')}\n"
             )
+            formatted_results.append(content_block)
 
-            formatted_results = []
-            for result in response.get('results', []):
-                content_block = (
-                    f"SOURCE: {result.get('url')}\n"
-                    f"TITLE: {result.get('title')}\n"
-                    f"CONTENT: {result.get('content')}\n"
-                )
-                formatted_results.append(content_block)
-            
-            return "\n---\n".join(formatted_results)
+        return "\n---\n".join(formatted_results)
 
+    def execute_search(self, query: str, max_results: int = 5, max_age: float = None):
+        """
+        Conducts an advanced search and returns structured context for the Analysis Agent.
+        """
+        try:
+            return self.format_results(self.fetch_results(query, max_results, max_age))
         except Exception as e:
             return f"Error during search: {str(e)}"
 
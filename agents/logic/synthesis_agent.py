@@ -1,11 +1,38 @@
-from agents.core.llm_client import GroqClient
+import asyncio
+import os
+from agents.core.context_packer import CONTEXT_BUDGETS, DEFAULT_BUDGET, count_tokens, pack
+from agents.core.llm_client import get_gateway
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Above this many input tokens, analyses are condensed in parallel groups before the final pass
+MAP_REDUCE_THRESHOLD = int(os.getenv(
+    "SYNTHESIS_MAP_REDUCE_THRESHOLD", str(CONTEXT_BUDGETS.get("synthesis", DEFAULT_BUDGET))
+))
+MAP_GROUP_TOKENS = int(os.getenv("SYNTHESIS_MAP_GROUP_TOKENS", "3000"))
+MAP_MAX_TOKENS = int(os.getenv("SYNTHESIS_MAP_MAX_TOKENS", "800"))
+MAX_MAP_LEVELS = 3
+
+
+def _group(texts: list[str], group_tokens: int) -> list[list[str]]:
+    """Consecutive runs of texts of about `group_tokens` tokens each."""
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and size + tokens > group_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
 class SynthesisAgent:
     def __init__(self):
-        self.llm = GroqClient()
+        self.llm = get_gateway()
         self.system_prompt = (
             "You are the Lead Research Synthesizer for ResearchPilot AI. "
             "You will be given several sub-analyses on a topic. Your job is to: \n"
@@ -14,18 +41,73 @@ class SynthesisAgent:
             "3. MUST MUST MUST Output exactly three main Markdown sections labeled exactly as follows: '## Summary', '## Hypothesis', and '## Search Results'. Do not add any other top-level markdown headers.\n"
             "4. Retain all source URLs as citations under the Search Results section."
         )
+        self.map_prompt = (
+            "You are a Research Summarizer for ResearchPilot AI. You condense a group of "
+            "sub-analyses into a dense partial summary that a later step will merge with others. "
+            "Keep every key finding, every hypothesis with its variables and verification method, "
+            "and every source URL next to the fact it supports. Do not add Markdown headers."
+        )
 
-    def synthesize(self, main_topic: str, all_analyses: list[str]):
-        print(f"✍️ SynthesisAgent: Compiling final report for '{main_topic}'...")
-        
-        combined_text = "\n\n".join(all_analyses)
-        prompt = (
+    def _build_prompt(self, main_topic: str, all_analyses: list[str]):
+        combined_text = pack(all_analyses, "synthesis")
+        return (
             f"Main Topic: {main_topic}\n\n"
             f"Individual Analyses:\n{combined_text}\n\n"
             "Synthesize this into a single, cohesive research report. Make sure your output absolutely contains '## Summary', '## Hypothesis', and '## Search Results' headers so it can be parsed."
         )
 
+    async def _summarize_group(self, main_topic: str, group: list[str]) -> str:
+        prompt = (
+            f"Main Topic: {main_topic}\n\n"
+            f"Sub-Analyses:\n{pack(group, 'synthesis_map')}\n\n"
+            "Condense these into one partial summary, keeping all facts, hypotheses and source URLs."
+        )
+        try:
+            return await self.llm.generate(
+                prompt, system_message=self.map_prompt, stage="synthesis_map", max_tokens=MAP_MAX_TOKENS
+            )
+        except Exception as e:
+            print(f"SynthesisAgent: Partial summary failed ({e}); passing the group through.")
+            return "\n\n".join(group)
+
+    async def _map(self, main_topic: str, all_analyses: list[str]) -> list[str]:
+        """
+        Map step of map-reduce synthesis: while the inputs are over
+        MAP_REDUCE_THRESHOLD tokens, groups of them are condensed into
+        partial summaries in parallel. Small inputs are returned unchanged.
+        """
+        texts = list(all_analyses)
+        for level in range(MAX_MAP_LEVELS):
+            total = sum(count_tokens(text) for text in texts)
+            if total <= MAP_REDUCE_THRESHOLD:
+                break
+            groups = _group(texts, MAP_GROUP_TOKENS)
+            if len(groups) == 1 and level:
+                # A single summary that is still too long is left to the packer
+                break
+            print(f"✍️ SynthesisAgent: Map-reduce level {level + 1}: {len(texts)} inputs ({total} tokens) -> {len(groups)} partial summaries...")
+            texts = await asyncio.gather(*(self._summarize_group(main_topic, group) for group in groups))
+        return list(texts)
+
+    async def synthesize(self, main_topic: str, all_analyses: list[str]):
+        print(f"✍️ SynthesisAgent: Compiling final report for '{main_topic}'...")
+        prompt = self._build_prompt(main_topic, await self._map(main_topic, all_analyses))
+
+        try:
+            return await self.llm.generate(prompt, system_message=self.system_prompt, stage="synthesis")
+        except Exception as e:
+            return f"Error during synthesis: {str(e)}"
+
+    async def synthesize_stream(self, main_topic: str, all_analyses: list[str]):
+        """
+        Same as synthesize(), but yields the report token by token.
+        Partial summaries (for large inputs) are built before the first token.
+        """
+        print(f"✍️ SynthesisAgent: Streaming final report for '{main_topic}'...")
+        prompt = self._build_prompt(main_topic, await self._map(main_topic, all_analyses))
+
         try:
-            return self.llm.generate(prompt, system_message=self.system_prompt)
+            async for delta in self.llm.stream(prompt, system_message=self.system_prompt, stage="synthesis"):
+                yield delta
         except Exception as e:
-            return f"Error during synthesis: {str(e)}"
\ No newline at end of file
+            yield f"Error during synthesis: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,7 @@
 import sys
 import os
 import time
+import asyncio
 
 # Ensure the project root is in the path for module imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -23,7 +24,7 @@ class ResearchPilot:
         self.hypothesizer = HypothesisAgent()
         self.synthesizer = SynthesisAgent()
 
-    def start_mission(self, topic: str):
+    async def start_mission(self, topic: str):
         """
         Executes the hierarchical research workflow.
         """
@@ -33,7 +34,7 @@ class ResearchPilot:
 
         # 1. STRATEGIC PLANNING
         # Breaks the main topic into 3 searchable sub-queries
-        plan = self.planner.generate_plan(topic)
+        plan = await self.planner.generate_plan(topic)
         
         results_pool = []
 
@@ -42,22 +43,22 @@ class ResearchPilot:
         for i, sub_query in enumerate(plan):
             print(f"\n📍 PHASE {i+1}/{len(plan)}: Investigating '{sub_query}'")
             
-            raw_data = self.searcher.execute_search(sub_query)
-            analysis = self.analyzer.analyze_results(sub_query, raw_data)
+            # Off the loop: the shared Tavily limiter may make the search wait its turn
+            raw_data = await asyncio.to_thread(self.searcher.execute_search, sub_query)
+            analysis = await self.analyzer.analyze_results(sub_query, raw_data)
             
             results_pool.append(analysis)
-            time.sleep(1) # Respect API rate limits
 
         # 3. SCIENTIFIC HYPOTHESIS GENERATION
         # Analyzes current findings to propose testable new theories
         print("\n🧪 PHASE 4: Generating Scientific Hypotheses...")
         combined_analysis = "\n\n".join(results_pool)
-        hypotheses = self.hypothesizer.generate_hypotheses(topic, combined_analysis)
+        hypotheses = await self.hypothesizer.generate_hypotheses(topic, combined_analysis)
 
         # 4. FINAL SYNTHESIS
         # Merges all analyses and hypotheses into a cohesive document
         print("\n✍️ PHASE 5: Final Synthesis & Polishing...")
-        final_report = self.synthesizer.synthesize(topic, results_pool + [hypotheses])
+        final_report = await self.synthesizer.synthesize(topic, results_pool + [hypotheses])
 
         # 5. EXPORT & FINISH
         self.export_report(topic, final_report)
@@ -80,4 +81,4 @@ if __name__ == "__main__":
 
     pilot = ResearchPilot()
     user_input = input("Enter your research topic: ")
-    pilot.start_mission(user_input)
\ No newline at end of file
+    asyncio.run(pilot.start_mission(user_input))
\ No newline at end of file
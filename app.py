@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import time
+import asyncio
 from dotenv import load_dotenv
 
 # Import your agents
@@ -9,6 +10,9 @@ from agents.logic.search_agent import SearchAgent
 from agents.logic.analysis_agent import AnalysisAgent
 from agents.logic.hypothesis_agent import HypothesisAgent
 from agents.logic.synthesis_agent import SynthesisAgent
+from agents.core.llm_client import get_gateway
+from agents.core.context_packer import load_encoder
+from app.services.arxiv_service import ArxivService
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +28,45 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+async def run_mission(query, planner, searcher, analyzer, hypothesizer, synthesizer):
+    """
+    Runs the whole mission on one event loop, so every agent call shares the
+    gateway's connection pool; the gateway and arXiv pools are closed when
+    the mission ends.
+    """
+    try:
+        # Off the loop: loading the tiktoken encoding can download it
+        await asyncio.to_thread(load_encoder)
+
+        # 1. Planning
+        st.write("📋 **PlannerAgent**: Breaking down the mission into sub-tasks...")
+        plan = await planner.generate_plan(query)
+        st.write(f"Objective established: {len(plan)} focus areas identified.")
+
+        results_pool = []
+
+        # 2. Sequential Search & Analysis
+        for i, sub_query in enumerate(plan):
+            st.write(f"🔍 **SearchAgent**: Investigating '{sub_query}'...")
+            raw_data = await asyncio.to_thread(searcher.execute_search, sub_query)
+
+            st.write(f"🧠 **AnalysisAgent**: Synthesizing data for phase {i+1}...")
+            analysis = await analyzer.analyze_results(sub_query, raw_data)
+            results_pool.append(analysis)
+
+        # 3. Hypothesis Generation
+        st.write("🧪 **HypothesisAgent**: Ideating novel scientific propositions...")
+        combined_analysis = "\n\n".join(results_pool)
+        hypotheses = await hypothesizer.generate_hypotheses(query, combined_analysis)
+
+        # 4. Final Synthesis
+        st.write("✍️ **SynthesisAgent**: Polishing the final comprehensive report...")
+        final_report = await synthesizer.synthesize(query, results_pool + [hypotheses])
+        return final_report, hypotheses
+    finally:
+        await get_gateway().aclose()
+        await ArxivService.aclose()
+
 def main():
     st.title("🚀 ResearchPilot AI")
     st.subheader("Your Agentic Scientific Collaborator")
@@ -54,32 +97,9 @@ def main():
 
         # Step-by-step Execution with Status Container
         with st.status("🤖 AI Agents are collaborating...", expanded=True) as status:
-            
-            # 1. Planning
-            st.write("📋 **PlannerAgent**: Breaking down the mission into sub-tasks...")
-            plan = planner.generate_plan(query)
-            st.write(f"Objective established: {len(plan)} focus areas identified.")
-            
-            results_pool = []
-            
-            # 2. Sequential Search & Analysis
-            for i, sub_query in enumerate(plan):
-                st.write(f"🔍 **SearchAgent**: Investigating '{sub_query}'...")
-                raw_data = searcher.execute_search(sub_query)
-                
-                st.write(f"🧠 **AnalysisAgent**: Synthesizing data for phase {i+1}...")
-                analysis = analyzer.analyze_results(sub_query, raw_data)
-                results_pool.append(analysis)
-                
-            # 3. Hypothesis Generation
-            st.write("🧪 **HypothesisAgent**: Ideating novel scientific propositions...")
-            combined_analysis = "\n\n".join(results_pool)
-            hypotheses = hypothesizer.generate_hypotheses(query, combined_analysis)
-            
-            # 4. Final Synthesis
-            st.write("✍️ **SynthesisAgent**: Polishing the final comprehensive report...")
-            final_report = synthesizer.synthesize(query, results_pool + [hypotheses])
-            
+            final_report, hypotheses = asyncio.run(
+                run_mission(query, planner, searcher, analyzer, hypothesizer, synthesizer)
+            )
             status.update(label="Mission Accomplished!", state="complete", expanded=False)
 
         # Tabs for Output
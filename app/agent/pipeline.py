@@ -9,7 +9,32 @@ class ResearchAgent:
         self.arxiv = ArxivService()
         self.llm = LLMService()
 
-    async def run_discovery(self, db: Session, session_id: int, query: str):
+    def _save_paper(self, db: Session, session: ResearchSession, p: dict):
+        # Check for existing paper by URL or ArXiv ID to avoid unique constraint crashes
+        existing = db.query(ResearchPaper).filter(
+            (ResearchPaper.url == p['url']) | 
+            (ResearchPaper.arxiv_id == p.get('arxiv_id'))
+        ).first()
+
+        if existing:
+            if existing not in session.papers:
+                session.papers.append(existing)
+            return
+
+        # Create new paper object
+        db_paper = ResearchPaper(
+            title=p.get('title', 'Untitled'),
+            summary=p.get('abstract', p.get('summary', 'No summary available')),
+            url=p.get('url'),
+            authors=p.get('authors', 'Unknown Authors'),
+            arxiv_id=p.get('arxiv_id') # Crucial for your ResearchPaper model
+        )
+        
+        db.add(db_paper)
+        db.flush() # Flushes to DB to get an ID without committing yet
+        session.papers.append(db_paper)
+
+    async def run_discovery(self, db: Session, session_id: int, query: str, max_results: int = 5):
         # --- 1. Fetch the Session Object First ---
         # This fixes the 'UnboundLocalError' by making 'session' available to the loop
         session = db.query(ResearchSession).filter(ResearchSession.id == session_id).first()
@@ -17,50 +42,18 @@ class ResearchAgent:
             print(f"ERROR: Session {session_id} not found in database.")
             return None
 
-        # --- 2. Fetch Papers from ArXiv ---
-        raw_papers = await self.arxiv.search_papers(query, max_results=5)
-        
-        # Handle different response formats (String vs List)
-        if isinstance(raw_papers, str):
-            raw_papers = json.loads(raw_papers)
-        
-        if isinstance(raw_papers, dict) and 'error' in raw_papers:
-            print(f"ERROR: {raw_papers['error']}")
+        # --- 2. Stream Papers from ArXiv and 3. Save Them as They Arrive ---
+        # Pages come over the pooled ArXiv client, so large topics (100+
+        # papers) don't pay connection setup per request.
+        raw_papers = []
+        try:
+            async for p in self.arxiv.iter_papers(query, max_results=max_results):
+                raw_papers.append(p)
+                self._save_paper(db, session, p)
+        except Exception as e:
+            print(f"ERROR: {e}")
             return None
 
-        if not isinstance(raw_papers, list):
-            raw_papers = [raw_papers]
-
-        # --- 3. Process and Save Papers ---
-        for p in raw_papers:
-            # Handle nested strings if necessary
-            if isinstance(p, str):
-                p = json.loads(p)
-
-            # Check for existing paper by URL or ArXiv ID to avoid unique constraint crashes
-            existing = db.query(ResearchPaper).filter(
-                (ResearchPaper.url == p['url']) | 
-                (ResearchPaper.arxiv_id == p.get('arxiv_id'))
-            ).first()
-
-            if existing:
-                if existing not in session.papers:
-                    session.papers.append(existing)
-                continue
-
-            # Create new paper object
-            db_paper = ResearchPaper(
-                title=p.get('title', 'Untitled'),
-                summary=p.get('abstract', p.get('summary', 'No summary available')),
-                url=p.get('url'),
-                authors=p.get('authors', 'Unknown Authors'),
-                arxiv_id=p.get('arxiv_id') # Crucial for your ResearchPaper model
-            )
-            
-            db.add(db_paper)
-            db.flush() # Flushes to DB to get an ID without committing yet
-            session.papers.append(db_paper)
-
         # --- 4. Generate AI Briefing ---
         # Construct context for the LLM
         context_text = "\n".join([
@@ -78,4 +71,25 @@ class ResearchAgent:
         db.commit()
         db.refresh(session)
         print(f"--- Session {session_id} Successfully Updated ---")
-        return session
\ No newline at end of file
+        return session
+
+    async def refresh_papers(self, db: Session, arxiv_ids: list[str] = None):
+        """
+        Re-fetches metadata for papers already in the database using batched
+        ArXiv id_list lookups. Defaults to every stored paper.
+        """
+        if arxiv_ids is None:
+            arxiv_ids = [row[0] for row in db.query(ResearchPaper.arxiv_id).filter(ResearchPaper.arxiv_id.isnot(None))]
+        if not arxiv_ids:
+            return 0
+
+        updated = 0
+        for p in await self.arxiv.fetch_by_ids(arxiv_ids):
+            paper = db.query(ResearchPaper).filter(ResearchPaper.arxiv_id == p['arxiv_id']).first()
+            if paper:
+                paper.title = p['title']
+                paper.summary = p['abstract']
+                paper.authors = p['authors']
+                updated += 1
+        db.commit()
+        return updated
\ No newline at end of file
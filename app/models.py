@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Table
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Table, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -53,4 +53,28 @@ class ResearchSession(Base):
     # Relationships
     owner = relationship("User", back_populates="sessions")
     # Many-to-Many relationship with ResearchPaper
-    papers = relationship("ResearchPaper", secondary=session_papers)
\ No newline at end of file
+    papers = relationship("ResearchPaper", secondary=session_papers)
+
+class CachedReport(Base):
+    __tablename__ = "cached_reports"
+    __table_args__ = {'extend_existing': True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Normalized topic + attached document (see MissionCoalescer.make_key)
+    key = Column(String, unique=True, index=True)
+    topic = Column(String)
+    document_id = Column(String, nullable=True)
+    report = Column(Text)
+    updated_at = Column(DateTime, index=True)
+
+
+class MissionCheckpoint(Base):
+    __tablename__ = "mission_checkpoints"
+    __table_args__ = (UniqueConstraint('mission_key', 'stage'), {'extend_existing': True})
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Same key as the report cache: normalized topic + attached document
+    mission_key = Column(String, index=True)
+    stage = Column(String)  # "plan", "query:<i>", "hypotheses"
+    data = Column(Text)     # JSON-encoded stage output
+    updated_at = Column(DateTime)
@@ -4,6 +4,7 @@ from typing import List
 from app import models, schemas, database
 from app.agent.pipeline import ResearchAgent
 from app.services.auth_service import get_current_user
+from app.services.mission_scheduler import get_scheduler, QueueFull, Ticket
 from app.database import get_db
 from app import schemas
 
@@ -11,8 +12,19 @@ router = APIRouter(prefix="/research", tags=["Research"])
 agent = ResearchAgent()
 
 # Helper function for the background work
-async def perform_research(session_id: int, topic: str):
+async def perform_research(session_id: int, topic: str, ticket: Ticket = None):
     db = database.SessionLocal()
+    try:
+        if ticket is not None:
+            # Hold a scheduler slot for the whole run; waits while queued
+            async with get_scheduler().slot(ticket):
+                await _run_research(db, session_id, topic)
+        else:
+            await _run_research(db, session_id, topic)
+    finally:
+        db.close()
+
+async def _run_research(db: Session, session_id: int, topic: str):
     try:
         # Update status to 'processing' so the UI can show a spinner
         session = db.query(models.ResearchSession).get(session_id)
@@ -36,8 +48,6 @@ async def perform_research(session_id: int, topic: str):
             # Optional: store the error message in a column if you have one
             # session.error_message = str(e)
             db.commit()
-    finally:
-        db.close()
 
 @router.post("/start", response_model=schemas.SessionResponse, status_code=status.HTTP_201_CREATED)
 async def start_research_session(
@@ -46,21 +56,38 @@ async def start_research_session(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # 1. Create the record immediately
-    new_session = models.ResearchSession(
-        topic=request.topic, 
-        user_id=current_user.id,
-        summary="Processing..." # Set an initial state
-    )
-    
-    db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    # 1. Take a place in the mission queue (429 if it is full)
+    try:
+        ticket = get_scheduler().enqueue(current_user.id, priority="batch")
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
 
-    # 2. Add the heavy agent logic to the background queue
-    background_tasks.add_task(perform_research, new_session.id, request.topic)
+    # 2. Create the record immediately
+    try:
+        new_session = models.ResearchSession(
+            topic=request.topic, 
+            user_id=current_user.id,
+            summary="Processing..." # Set an initial state
+        )
+        
+        db.add(new_session)
+        db.commit()
+        db.refresh(new_session)
+    except Exception:
+        # Give the queue place back, or it would hold a worker slot forever
+        get_scheduler().release(ticket)
+        raise
+    ticket.session_ids.add(new_session.id)
+
+    # 3. Add the heavy agent logic to the background queue
+    background_tasks.add_task(perform_research, new_session.id, request.topic, ticket)
 
-    # 3. Return immediately!
+    # 4. Return immediately!
+    new_session.queue_position = get_scheduler().position(ticket)
     return new_session
 
 @router.get("/sessions/{session_id}", response_model=schemas.SessionResponse)
@@ -80,5 +107,6 @@ async def get_research_status(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Research session not found"
         )
-    
+
+    session.queue_position = get_scheduler().position_of_session(session.id)
     return session
\ No newline at end of file
@@ -42,6 +42,8 @@ class SessionResponse(BaseModel):
     status: str  # CRITICAL: Added for the polling state machine
     ai_analysis: Optional[str] = None # Renamed from briefing to match your DB model
     created_at: datetime
+    # Place in the mission queue while the session waits for a worker
+    queue_position: Optional[int] = None
     # This triggers the Many-to-Many serialization
     papers: List[PaperSchema] = []
 
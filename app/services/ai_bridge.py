@@ -1,13 +1,11 @@
-import os
-from groq import Groq
 from typing import List, Dict
+from agents.core.llm_client import get_gateway
 
 class AIBridge:
     def __init__(self):
-        # This will look for the GROQ_API_KEY we discussed in your .env
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        # Using Llama 3.3 70B as per the ResearchHub AI project requirements
-        self.model = "llama-3.3-70b-specdec"
+        # Requests go through the shared LLM gateway (GROQ_API_KEY from your .env)
+        # The model comes from the "chat" route (large tier, Llama 3.3 70B by default)
+        self.stage = "chat"
 
     async def get_response(self, user_message: str, chat_history: List[Dict[str, str]] = None):
         """
@@ -21,14 +19,14 @@ class AIBridge:
         messages = chat_history + [{"role": "user", "content": user_message}]
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+            # Sampled replies: a repeated question gets a fresh answer, not a cached one
+            return await get_gateway().chat(
+                messages,
+                stage=self.stage,
+                use_cache=False,
                 temperature=0.7,
                 max_tokens=1024,
                 top_p=1,
-                stream=False,
             )
-            return completion.choices[0].message.content
         except Exception as e:
             return f"Error connecting to AI Agents: {str(e)}"
\ No newline at end of file
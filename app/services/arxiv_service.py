@@ -1,51 +1,130 @@
+import asyncio
+import weakref
+import xml.etree.ElementTree as ET
 import httpx
-import feedparser
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
 
 class ArxivService:
-    def __init__(self):
-        self.base_url = "https://export.arxiv.org/api/query"
+    # One keep-alive pool per event loop, shared by every ArxivService instance
+    _clients = weakref.WeakKeyDictionary()
 
-    async def search_papers(self, query: str, max_results: int = 5):
-        params = {
-            "search_query": f"all:{query}",
-            "start": 0,
-            "max_results": max_results
-        }
-        
+    def __init__(self, page_size: int = 100, page_delay: float = 3.0):
+        self.base_url = "https://export.arxiv.org/api/query"
         # ArXiv requires a specific User-Agent to avoid being flagged as a scraper
-        headers = {
+        self.headers = {
             "User-Agent": "ResearchPilotAI/1.0 (contact: your-email@example.com)"
         }
+        self.page_size = page_size
+        # ArXiv asks API clients to wait ~3 seconds between consecutive calls
+        self.page_delay = page_delay
 
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            try:
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                follow_redirects=True,
+                headers=self.headers,
                 # Use a slightly longer timeout for ArXiv's XML response
-                response = await client.get(
-                    self.base_url, 
-                    params=params, 
-                    headers=headers, 
-                    timeout=15.0
-                )
-                response.raise_for_status()
-                
-                # feedparser handles the Atom XML format returned by ArXiv
-                feed = feedparser.parse(response.text)
-                
-                if not feed.entries:
-                    return []
-
-                papers = []
-                for entry in feed.entries:
-                    papers.append({
-                        "title": entry.title.replace('\n', ' ').strip(),
-                        "abstract": entry.summary.strip(),
-                        "url": entry.link,
-                        "authors": ", ".join([a.name for a in entry.authors]),
-                        "arxiv_id": entry.id.split('/abs/')[-1]
-                    })
-                return papers
-
-            except Exception as e:
-                # This is what's currently triggering your 'Failed to fetch' debug
-                print(f"CRITICAL: ArXiv Fetch Error -> {e}")
-                return {"error": str(e)}
\ No newline at end of file
+                timeout=15.0,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60),
+            )
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _parse_entry(entry: ET.Element) -> dict:
+        entry_id = entry.findtext(f"{ATOM}id", "").strip()
+        url = entry_id
+        for link in entry.findall(f"{ATOM}link"):
+            if link.get("rel") == "alternate":
+                url = link.get("href", url)
+                break
+        return {
+            "title": " ".join(entry.findtext(f"{ATOM}title", "").split()),
+            "abstract": entry.findtext(f"{ATOM}summary", "").strip(),
+            "url": url,
+            "authors": ", ".join(
+                a.findtext(f"{ATOM}name", "").strip() for a in entry.findall(f"{ATOM}author")
+            ),
+            "arxiv_id": entry_id.split('/abs/')[-1]
+        }
+
+    async def _stream_entries(self, params: dict, meta: dict = None):
+        """
+        Streams one Atom response and yields paper dicts as each <entry> closes.
+        Parsed entries are detached from the tree right away, so memory stays
+        flat regardless of page size. `meta['total']` receives opensearch:totalResults.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        root = None
+        async with self._client().stream("GET", self.base_url, params=params) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = elem
+                        continue
+                    if elem.tag == f"{ATOM}entry":
+                        yield self._parse_entry(elem)
+                        root.remove(elem)
+                    elif elem.tag == f"{OPENSEARCH}totalResults" and meta is not None:
+                        meta["total"] = int(elem.text or 0)
+        parser.close()
+
+    async def iter_papers(self, query: str, max_results: int = 100, page_size: int = None):
+        """
+        Async generator over up to `max_results` papers, fetched page by page
+        over the shared connection pool.
+        """
+        page_size = min(page_size or self.page_size, max_results)
+        start = 0
+        while start < max_results:
+            params = {
+                "search_query": f"all:{query}",
+                "start": start,
+                "max_results": min(page_size, max_results - start)
+            }
+            meta = {}
+            count = 0
+            async for paper in self._stream_entries(params, meta):
+                count += 1
+                yield paper
+
+            start += count
+            if count < params["max_results"] or start >= meta.get("total", max_results):
+                return
+            await asyncio.sleep(self.page_delay)
+
+    async def fetch_by_ids(self, arxiv_ids: list[str], batch_size: int = 100):
+        """
+        Looks up known papers by ArXiv ID using batched `id_list` requests.
+        """
+        papers = []
+        for i in range(0, len(arxiv_ids), batch_size):
+            if i:
+                await asyncio.sleep(self.page_delay)
+            batch = arxiv_ids[i:i + batch_size]
+            params = {"id_list": ",".join(batch), "max_results": len(batch)}
+            async for paper in self._stream_entries(params):
+                papers.append(paper)
+        return papers
+
+    async def search_papers(self, query: str, max_results: int = 5):
+        try:
+            return [paper async for paper in self.iter_papers(query, max_results=max_results)]
+        except Exception as e:
+            # This is what's currently triggering your 'Failed to fetch' debug
+            print(f"CRITICAL: ArXiv Fetch Error -> {e}")
+            return {"error": str(e)}
+
+    @classmethod
+    async def aclose(cls):
+        """Closes the pooled client of the current event loop."""
+        client = cls._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
@@ -1,5 +1,5 @@
 import os
-from groq import AsyncGroq # Using Async for better FastAPI performance
+from agents.core.llm_client import get_gateway # Shared async gateway for better FastAPI performance
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,11 +10,9 @@ class LLMService:
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
             print("WARNING: GROQ_API_KEY is missing from environment variables!")
-            
-        self.client = AsyncGroq(api_key=self.api_key)
         
-        # 2. Set the model to the one required by project specs
-        self.model = "llama-3.3-70b-versatile"
+        # 2. The model comes from the "briefing" route (large tier, Llama 3.3 70B by default)
+        self.stage = "briefing"
 
     async def summarize_research(self, context_text: str):
         """
@@ -37,17 +35,14 @@ class LLMService:
         """
 
         try:
-            # Using AsyncGroq for non-blocking execution
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional research architect specialized in academic synthesis."},
-                    {"role": "user", "content": prompt}
-                ],
+            # The shared gateway keeps this non-blocking and on the pooled connections
+            return await get_gateway().generate(
+                prompt,
+                system_message="You are a professional research architect specialized in academic synthesis.",
+                stage=self.stage,
                 temperature=0.3,
                 max_tokens=2048
             )
-            return response.choices[0].message.content
         except Exception as e:
             print(f"Groq LLM Error: {e}")
             return f"Analysis unavailable due to Groq service error: {str(e)}"
\ No newline at end of file
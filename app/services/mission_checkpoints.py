@@ -0,0 +1,71 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from app import models
+from app.database import SessionLocal
+
+# Checkpoints older than this are ignored (search results go stale) and pruned
+MISSION_CHECKPOINT_TTL_HOURS = float(os.getenv("MISSION_CHECKPOINT_TTL_HOURS", "24"))
+
+
+class MissionCheckpoints:
+    """
+    Stage outputs of one mission key, as consumed by
+    ResearchOrchestrator.run_mission(checkpoint=...). Methods hit the
+    database synchronously; the orchestrator calls them via asyncio.to_thread.
+    """
+
+    def __init__(self, store: "CheckpointStore", mission_key: str):
+        self.store = store
+        self.mission_key = mission_key
+
+    def load(self) -> dict:
+        cutoff = datetime.utcnow() - self.store.ttl
+        db = self.store.session_factory()
+        try:
+            rows = db.query(models.MissionCheckpoint).filter(
+                models.MissionCheckpoint.mission_key == self.mission_key,
+                models.MissionCheckpoint.updated_at >= cutoff
+            ).all()
+            return {row.stage: json.loads(row.data) for row in rows}
+        finally:
+            db.close()
+
+    def save(self, stage: str, value):
+        db = self.store.session_factory()
+        try:
+            row = db.query(models.MissionCheckpoint).filter(
+                models.MissionCheckpoint.mission_key == self.mission_key,
+                models.MissionCheckpoint.stage == stage
+            ).first()
+            if row is None:
+                row = models.MissionCheckpoint(mission_key=self.mission_key, stage=stage)
+                db.add(row)
+            row.data = json.dumps(value)
+            row.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self):
+        db = self.store.session_factory()
+        try:
+            db.query(models.MissionCheckpoint).filter(
+                models.MissionCheckpoint.mission_key == self.mission_key
+            ).delete()
+            db.query(models.MissionCheckpoint).filter(
+                models.MissionCheckpoint.updated_at < datetime.utcnow() - self.store.ttl
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class CheckpointStore:
+    def __init__(self, session_factory=SessionLocal, ttl_hours: float = MISSION_CHECKPOINT_TTL_HOURS):
+        self.session_factory = session_factory
+        self.ttl = timedelta(hours=ttl_hours)
+
+    def for_mission(self, mission_key: str) -> MissionCheckpoints:
+        return MissionCheckpoints(self, mission_key)
@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import random
+import time
+import uuid
+
+from agents.core.search_cache import normalize_query
+from app import models
+from app.database import SessionLocal
+
+
+class _Flight:
+    def __init__(self, key: str):
+        self.key = key
+        self.mission_id = f"flight-{uuid.uuid4().hex}"
+        self.history = []
+        self.subscribers = set()
+        self.task = None
+        self.ticket = None
+        # done: the mission has finished; closed: subscribers have been sent the end marker
+        self.done = False
+        self.closed = False
+        # ResearchSession id -> time its request subscribed
+        self.sessions = {}
+        self.report = None
+
+
+class MissionCoalescer:
+    """
+    Single-flight layer over ResearchOrchestrator.run_mission.
+
+    Missions are keyed on the normalized topic plus the attached document.
+    The first request for a key starts the mission in a background task;
+    identical requests arriving while it runs subscribe to the same event
+    stream (getting the events emitted so far replayed first) instead of
+    starting their own planner/search/analysis/synthesis run. The mission
+    keeps running if its first requester disconnects. Finished reports are
+    written to `report_cache` when one is given (failed syntheses, marked
+    "error" on the complete event, are not). With a `scheduler`, new
+    missions wait for a worker slot (joiners never take one of their own).
+    With `checkpoints` (a CheckpointStore), stage outputs are saved under
+    the mission key, so a mission retried after a failure or restart
+    resumes from its last finished stage; they are cleared once a report
+    has been produced and the requesters' sessions are filled in. When the
+    mission ends, the ResearchSession of every request that subscribed with
+    a `session_id` is marked completed (with the shared report) or failed,
+    whether or not that client is still connected. A finished flight stays
+    joinable until then, so a client reconnecting in between gets its
+    replay instead of a new mission.
+    """
+
+    def __init__(self, orchestrator, report_cache=None, scheduler=None, checkpoints=None,
+                 session_factory=SessionLocal):
+        self.orchestrator = orchestrator
+        self.report_cache = report_cache
+        self.scheduler = scheduler
+        self.checkpoints = checkpoints
+        self.session_factory = session_factory
+        self.flights = {}
+        self.started = 0
+        self.joined = 0
+
+    @staticmethod
+    def make_key(topic: str, document_id: str = None) -> str:
+        return f"{normalize_query(topic)}|{document_id or ''}"
+
+    def in_flight(self, topic: str, document_id: str = None) -> bool:
+        return self.make_key(topic, document_id) in self.flights
+
+    async def _run(self, flight: _Flight, topic: str, options: dict):
+        checkpoint = self.checkpoints.for_mission(flight.key) if self.checkpoints is not None else None
+        try:
+            slot = contextlib.nullcontext()
+            if flight.ticket is not None:
+                if not flight.ticket.started.is_set():
+                    position = self.scheduler.position(flight.ticket)
+                    self._publish(flight, {"agent": "Scheduler", "status": "queued",
+                                           "msg": f"Waiting for a free worker (queue position {position})..."})
+                slot = self.scheduler.slot(flight.ticket)
+            async with slot:
+                async for update in self.orchestrator.run_mission(
+                    topic, mission_id=flight.mission_id, checkpoint=checkpoint, **options
+                ):
+                    if update.get("type") == "complete" and not update.get("error"):
+                        flight.report = update.get("content")
+                        await self._finish(flight, topic, flight.report, options.get("document_id"))
+                    self._publish(flight, update)
+        except Exception as e:
+            self._publish(flight, {"type": "error", "msg": str(e)})
+        finally:
+            # Subscribers arriving from here on fill their own session (see subscribe)
+            flight.done = True
+            filled = await self._fill_sessions(flight.sessions, flight.report)
+            if filled and flight.report is not None and checkpoint is not None:
+                try:
+                    await asyncio.to_thread(checkpoint.clear)
+                except Exception as e:
+                    print(f"Checkpoint cleanup failed: {e}")
+            # New requests start a fresh mission from here on
+            self.flights.pop(flight.key, None)
+            await asyncio.to_thread(self.orchestrator.memory.drop_namespace, flight.mission_id)
+            flight.closed = True
+            for queue in flight.subscribers:
+                queue.put_nowait(None)
+
+    async def _finish(self, flight: _Flight, topic: str, report: str, document_id: str):
+        if self.report_cache is None:
+            return
+        try:
+            await asyncio.to_thread(self.report_cache.set, flight.key, topic, report, document_id)
+        except Exception as e:
+            print(f"Report cache update failed: {e}")
+
+    async def _fill_sessions(self, sessions: dict, report: str) -> bool:
+        """Records the mission's outcome in its requesters' ResearchSession rows."""
+        if not sessions:
+            return True
+        try:
+            await asyncio.to_thread(self._write_sessions, dict(sessions), report)
+            return True
+        except Exception as e:
+            print(f"Session update failed: {e}")
+            return False
+
+    def _write_sessions(self, sessions: dict, report: str):
+        now = time.time()
+        db = self.session_factory()
+        try:
+            rows = db.query(models.ResearchSession).filter(models.ResearchSession.id.in_(list(sessions))).all()
+            for row in rows:
+                row.status = "completed" if report is not None else "failed"
+                row.ai_analysis = report
+                row.time_taken = f"{int(now - sessions[row.id])}s"
+                # Mock papers count since we're generating the report here
+                row.papers_count = random.randint(3, 15)
+            db.commit()
+        finally:
+            db.close()
+
+    def _publish(self, flight: _Flight, update: dict):
+        flight.history.append(update)
+        for queue in flight.subscribers:
+            queue.put_nowait(update)
+
+    def start(self, topic: str, document_id: str = None, user_id=None, priority: str = "interactive",
+              **options) -> _Flight:
+        """
+        Starts the mission for this key unless one is already in flight.
+        Raises QueueFull (see MissionScheduler) if it cannot be queued.
+        """
+        key = self.make_key(topic, document_id)
+        flight = self.flights.get(key)
+        if flight is not None:
+            print(f"🔗 MissionCoalescer: Joining in-flight mission for '{topic}'")
+            self.joined += 1
+        else:
+            ticket = self.scheduler.enqueue(user_id, priority) if self.scheduler is not None else None
+            flight = self.flights[key] = _Flight(key)
+            flight.ticket = ticket
+            flight.task = asyncio.create_task(self._run(flight, topic, {"document_id": document_id, **options}))
+            self.started += 1
+        return flight
+
+    async def run_mission(self, topic: str, document_id: str = None, session_id: int = None, **options):
+        """
+        Yields the mission's events like ResearchOrchestrator.run_mission.
+        `options` (concurrent, stream, user_id, priority, ...) only apply when
+        this call starts the mission; joiners get whatever the running
+        mission emits.
+        """
+        flight = self.start(topic, document_id, **options)
+        async for update in self.subscribe(flight, session_id):
+            yield update
+
+    async def subscribe(self, flight: _Flight, session_id: int = None, since: int = 0):
+        """
+        Replays a flight's events from index `since` on, then follows it
+        live; the n-th event yielded has index `since + n`. The
+        ResearchSession `session_id` is filled in when the flight ends (see
+        _fill_sessions), and attached to the scheduler ticket so the session
+        status endpoint can report its queue position.
+        """
+        if session_id is not None:
+            if flight.done:
+                await self._fill_sessions({session_id: time.time()}, flight.report)
+            else:
+                flight.sessions.setdefault(session_id, time.time())
+            if flight.ticket is not None:
+                flight.ticket.session_ids.add(session_id)
+
+        queue = asyncio.Queue()
+        # Replay and subscribe in one step so no event is missed or duplicated
+        backlog = flight.history[since:]
+        flight.subscribers.add(queue)
+        try:
+            for update in backlog:
+                yield update
+            # A flight that finished before we subscribed sends no end marker
+            while not (flight.closed and queue.empty()):
+                update = await queue.get()
+                if update is None:
+                    return
+                yield update
+        finally:
+            flight.subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self.flights), "started": self.started, "joined": self.joined}
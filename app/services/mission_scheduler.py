@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import math
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+MISSION_WORKERS = int(os.getenv("MISSION_WORKERS", "4"))
+MISSION_PER_USER_LIMIT = int(os.getenv("MISSION_PER_USER_LIMIT", "2"))
+MISSION_QUEUE_SIZE = int(os.getenv("MISSION_QUEUE_SIZE", "50"))
+
+
+def _parse_weights(spec: str) -> dict:
+    """'interactive=4,batch=2' -> {'interactive': 4.0, 'batch': 2.0}"""
+    weights = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, weight = item.split("=", 1)
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+# Share of worker time each priority class gets relative to the others
+PRIORITY_WEIGHTS = _parse_weights(os.getenv("MISSION_PRIORITY_WEIGHTS", "interactive=4,batch=2,background=1"))
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Mission queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, seq: int, user, priority: str, start_tag: float, session_ids=()):
+        self.seq = seq
+        self.user = user
+        self.priority = priority
+        self.start_tag = start_tag
+        self.session_ids = set(session_ids)
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.started = asyncio.Event()
+
+
+class MissionScheduler:
+    """
+    Bounded pool of mission slots shared by every mission entry point.
+
+    Waiting missions are ordered by start-time fair queuing with one flow
+    per user: each ticket's start tag is max(virtual time, the user's last
+    finish tag) and the finish tag adds 1 / priority weight, so users get
+    equal turns and higher classes (interactive > batch > background) get
+    proportionally more of them without starving the rest. A user never has
+    more than `per_user` missions running, and enqueue() raises QueueFull
+    (carrying a Retry-After estimate) once `max_queue` missions are waiting.
+    """
+
+    def __init__(self, workers: int = MISSION_WORKERS, per_user: int = MISSION_PER_USER_LIMIT,
+                 max_queue: int = MISSION_QUEUE_SIZE, weights: dict = None):
+        self.workers = max(1, workers)
+        self.per_user = max(1, per_user)
+        self.max_queue = max_queue
+        self.weights = weights or PRIORITY_WEIGHTS
+        self.waiting = []
+        self.running = 0
+        self.user_running = defaultdict(int)
+        self._user_finish = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        # Moving average of mission duration, for Retry-After estimates
+        self.avg_duration = 30.0
+        self.rejected = 0
+
+    def enqueue(self, user_id=None, priority: str = "interactive", session_ids=()) -> Ticket:
+        if len(self.waiting) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(self.retry_after())
+        user = user_id if user_id is not None else "anonymous"
+        weight = self.weights.get(priority, 1.0)
+        start_tag = max(self._vtime, self._user_finish.get(user, 0.0))
+        self._user_finish[user] = start_tag + 1.0 / weight
+        ticket = Ticket(next(self._seq), user, priority, start_tag, session_ids)
+        self.waiting.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def _ordered(self) -> list:
+        return sorted(self.waiting, key=lambda t: (t.start_tag, t.seq))
+
+    def _dispatch(self):
+        while self.running < self.workers:
+            ticket = next((t for t in self._ordered() if self.user_running[t.user] < self.per_user), None)
+            if ticket is None:
+                return
+            self.waiting.remove(ticket)
+            self._vtime = max(self._vtime, ticket.start_tag)
+            self.running += 1
+            self.user_running[ticket.user] += 1
+            ticket.started_at = time.time()
+            ticket.started.set()
+
+    def release(self, ticket: Ticket):
+        if ticket.started_at is None:
+            # Never started: just leave the queue
+            if ticket in self.waiting:
+                self.waiting.remove(ticket)
+            return
+        self.running -= 1
+        self.user_running[ticket.user] -= 1
+        if not self.user_running[ticket.user]:
+            del self.user_running[ticket.user]
+        self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.time() - ticket.started_at)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket):
+        """Waits for the ticket's turn and holds a worker slot for the block."""
+        try:
+            await ticket.started.wait()
+            yield
+        finally:
+            self.release(ticket)
+
+    def position(self, ticket: Ticket):
+        """1-based place in the queue, or None once started."""
+        ordered = self._ordered()
+        return ordered.index(ticket) + 1 if ticket in ordered else None
+
+    def position_of_session(self, session_id: int):
+        for i, ticket in enumerate(self._ordered()):
+            if session_id in ticket.session_ids:
+                return i + 1
+        return None
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_duration * (len(self.waiting) + 1) / self.workers))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "waiting": len(self.waiting),
+            "workers": self.workers,
+            "rejected": self.rejected,
+            "avg_duration_s": round(self.avg_duration, 1),
+        }
+
+
+_scheduler = None
+
+
+def get_scheduler() -> MissionScheduler:
+    """Process-wide scheduler shared by /research and the research router."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MissionScheduler()
+    return _scheduler
@@ -0,0 +1,66 @@
+import os
+from datetime import datetime, timedelta
+
+from app import models
+from app.database import SessionLocal
+
+# Cached reports older than this are still served (when the request's
+# freshness window allows) but trigger a background refresh
+REPORT_REFRESH_AFTER_HOURS = float(os.getenv("REPORT_REFRESH_AFTER_HOURS", "6"))
+# Reports older than this are never served and get pruned
+REPORT_CACHE_TTL_HOURS = float(os.getenv("REPORT_CACHE_TTL_HOURS", str(7 * 24)))
+
+
+class ReportCache:
+    """
+    Finished mission reports keyed on normalized topic + document, shared
+    across users. Methods hit the database synchronously; call them via
+    asyncio.to_thread from async code.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 refresh_after_hours: float = REPORT_REFRESH_AFTER_HOURS,
+                 ttl_hours: float = REPORT_CACHE_TTL_HOURS):
+        self.session_factory = session_factory
+        self.refresh_after = timedelta(hours=refresh_after_hours)
+        self.ttl = timedelta(hours=ttl_hours)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, max_age_hours: float):
+        """
+        Returns (report, age in seconds, needs_refresh) if a report younger
+        than `max_age_hours` (and the cache TTL) exists, else None.
+        """
+        max_age = min(timedelta(hours=max_age_hours), self.ttl)
+        db = self.session_factory()
+        try:
+            entry = db.query(models.CachedReport).filter(models.CachedReport.key == key).first()
+            if entry is None or datetime.utcnow() - entry.updated_at > max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            age = datetime.utcnow() - entry.updated_at
+            return entry.report, int(age.total_seconds()), age > self.refresh_after
+        finally:
+            db.close()
+
+    def set(self, key: str, topic: str, report: str, document_id: str = None):
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            entry = db.query(models.CachedReport).filter(models.CachedReport.key == key).first()
+            if entry is None:
+                entry = models.CachedReport(key=key)
+                db.add(entry)
+            entry.topic = topic
+            entry.document_id = document_id
+            entry.report = report
+            entry.updated_at = now
+            db.query(models.CachedReport).filter(models.CachedReport.updated_at < now - self.ttl).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
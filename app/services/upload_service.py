@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+
+from fastapi import HTTPException, status
+
+# Uploads live at uploads/<sha256[:2]>/<sha256>.<ext>, so identical files
+# uploaded by anyone are stored (and later parsed) exactly once
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# Allowance for multipart boundaries and part headers on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        self.max_bytes = max_bytes
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware that enforces the upload limit while the request body is
+    received. Starlette spools the whole multipart body before the endpoint
+    runs, so the check in UploadService.store() alone would only fire after
+    an oversized file was already read and written once. Requests to `paths`
+    are rejected with 413 up front when Content-Length is too large, and
+    cut off as soon as a body without one passes the limit.
+    """
+
+    def __init__(self, app, paths=("/api/v1/upload",), max_bytes: int = UPLOAD_MAX_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        self.limit = max_bytes + UPLOAD_FORM_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.limit:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"), (b"connection", b"close")]})
+            body = json.dumps({"detail": str(UploadTooLarge(self.max_bytes))}).encode()
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # Raised inside body parsing; FastAPI passes HTTPExceptions through as-is
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail=str(UploadTooLarge(self.max_bytes)))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def content_path(sha256: str, ext: str = "", upload_dir: str = UPLOAD_DIR) -> str:
+    name = f"{sha256}.{ext}" if ext else sha256
+    return os.path.join(upload_dir, sha256[:2], name)
+
+
+class UploadService:
+    def __init__(self, upload_dir: str = UPLOAD_DIR, max_bytes: int = UPLOAD_MAX_BYTES,
+                 chunk_bytes: int = UPLOAD_CHUNK_BYTES):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        os.makedirs(os.path.join(upload_dir, "tmp"), exist_ok=True)
+
+    async def store(self, upload) -> dict:
+        """
+        Streams a FastAPI UploadFile to disk in fixed-size chunks, hashing as
+        it goes. Disk writes run off the event loop and at most one chunk is
+        held in memory. Raises UploadTooLarge (and keeps nothing) once the
+        stream passes `max_bytes`.
+        """
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.upload_dir, "tmp", uuid.uuid4().hex)
+        out = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(self.chunk_bytes)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise UploadTooLarge(self.max_bytes)
+                await asyncio.to_thread(self._write, out, digest, chunk)
+        except BaseException:
+            await asyncio.to_thread(out.close)
+            await asyncio.to_thread(os.remove, tmp_path)
+            raise
+        await asyncio.to_thread(out.close)
+
+        sha256 = digest.hexdigest()
+        ext = os.path.splitext(upload.filename or "")[1].lstrip(".").lower()
+        path = content_path(sha256, ext, self.upload_dir)
+        deduplicated = await asyncio.to_thread(self._commit, tmp_path, path)
+        return {"sha256": sha256, "path": path, "size": size, "deduplicated": deduplicated}
+
+    @staticmethod
+    def _write(out, digest, chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    @staticmethod
+    def _commit(tmp_path: str, path: str) -> bool:
+        """Moves the temp file into place; returns True if the content was already stored."""
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return False
@@ -1,7 +1,8 @@
 import os
 import json
+import asyncio
 import uvicorn
-from fastapi import FastAPI, Query, Depends, HTTPException, status, File, UploadFile
+from fastapi import FastAPI, Query, Depends, HTTPException, status, File, UploadFile, BackgroundTasks, Header
 from fastapi import FastAPI, Query, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,6 +21,10 @@ Base.metadata.create_all(bind=engine)
 # THE CRITICAL LINE: Must be at the top level for Uvicorn to find it
 app = FastAPI(title="ResearchPilot AI Core")
 
+# Rejects oversized uploads while they are received (added first so CORS wraps its 413s)
+from app.services.upload_service import UploadSizeLimit
+app.add_middleware(UploadSizeLimit, paths=("/api/v1/upload",))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:5174", "http://127.0.0.1:5174"],
@@ -48,11 +53,43 @@ async def get_current_user_from_query(token: str = Query(None), db: Session = De
 # 1. INITIALIZE THE CORE
 try:
     from agents.core.orchestrator import ResearchOrchestrator
+    from app.services.mission_coalescer import MissionCoalescer
+    from app.services.report_cache import ReportCache
+    from app.services.mission_scheduler import get_scheduler
+    from app.services.mission_checkpoints import CheckpointStore
     orchestrator = ResearchOrchestrator()
+    # Finished reports are shared across users by topic
+    report_cache = ReportCache()
+    # Identical concurrent /research requests share one mission run
+    # Stage outputs are checkpointed so a retried mission resumes where it stopped
+    missions = MissionCoalescer(orchestrator, report_cache, get_scheduler(), CheckpointStore())
     print("✅ Cognitive Core (Agents & FAISS) Loaded Successfully")
 except Exception as e:
     print(f"❌ Error Loading Orchestrator: {e}")
     orchestrator = None
+    missions = None
+
+@app.on_event("startup")
+async def load_token_encoder():
+    # Loading the tiktoken encoding can download it; token counts are estimated until it is in
+    from agents.core import context_packer
+    asyncio.get_running_loop().run_in_executor(None, context_packer.load_encoder)
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    # Release the pooled LLM and arXiv connections held by this worker's event loop
+    from agents.core.llm_client import get_gateway
+    from app.services.arxiv_service import ArxivService
+    try:
+        await get_gateway().aclose()
+    except ValueError:
+        pass
+    await ArxivService.aclose()
+
+@app.on_event("shutdown")
+async def close_extraction_pool():
+    from agents.core import extraction
+    extraction.shutdown()
 
 @app.get("/")
 async def root():
@@ -60,25 +97,50 @@ async def root():
 
 import time
 import random
+from datetime import datetime, timezone
+
+from app.services.upload_service import UploadService, UploadTooLarge
+from app.services.mission_scheduler import QueueFull
 
-# Ensure uploads directory exists
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Content-addressed upload storage (creates the uploads directory)
+upload_service = UploadService()
 
 @app.post("/api/v1/upload")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     try:
-        file_location = os.path.join(UPLOAD_DIR, f"{current_user.id}_{file.filename}")
-        with open(file_location, "wb+") as file_object:
-            file_object.write(file.file.read())
-        return {"info": f"file '{file.filename}' saved successfully.", "path": file_location}
+        stored = await upload_service.store(file)
+        if orchestrator:
+            # Parse, chunk and embed once now so missions only look up relevant chunks
+            documents = orchestrator.documents
+            await asyncio.to_thread(documents.register, stored["sha256"], stored["path"], file.filename)
+            background_tasks.add_task(documents.build, stored["sha256"])
+        return {"info": f"file '{file.filename}' saved successfully.", "document_id": stored["sha256"], **stored}
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/documents/{document_id}")
+async def get_document_status(
+    document_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    if not orchestrator:
+        raise HTTPException(status_code=503, detail="Orchestrator not initialized")
+    try:
+        meta = await asyncio.to_thread(orchestrator.documents.meta, document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if meta["status"] == "missing":
+        raise HTTPException(status_code=404, detail="Document not found")
+    meta.pop("path", None)
+    return {"document_id": document_id, **meta}
+
 @app.get("/api/v1/sessions")
 async def get_sessions(
     db: Session = Depends(get_db),
@@ -124,17 +186,65 @@ async def delete_session(
 async def stream_research(
     topic: str = Query(...),
     token: str = Query(None),
+    concurrent: bool = Query(True),
+    stream: bool = Query(True),
+    stream_analysis: bool = Query(False),
+    document_id: str = Query(None),
+    max_age_hours: float = Query(None, ge=0, description="Serve a cached report younger than this many hours"),
+    last_event_id: str = Header(None, alias="Last-Event-ID"),
     db: Session = Depends(get_db)
 ):
     current_user = await get_current_user_from_query(token, db) if token else None
 
+    # A reconnecting EventSource sends the id of the last event it saw:
+    # "<session id>:<flight id>:<event index>" (see event ids below)
+    resume_session_id, resume_flight_id, resume_index = _parse_event_id(last_event_id)
+    new_session = None
+    if current_user and resume_session_id:
+        new_session = db.query(models.ResearchSession).filter(
+            models.ResearchSession.id == resume_session_id,
+            models.ResearchSession.user_id == current_user.id
+        ).first()
+
+    # Resolve the cache and queue the mission up front so a full queue is a real 429
+    options = {"concurrent": concurrent, "stream": stream, "stream_analysis": stream_analysis}
+    cached = None
+    flight = None
+    if orchestrator and not (new_session and new_session.status == "completed"):
+        if max_age_hours is not None:
+            cached = await asyncio.to_thread(
+                report_cache.get, missions.make_key(topic, document_id), max_age_hours
+            )
+        elif new_session and new_session.created_at and not missions.in_flight(topic, document_id):
+            # Its mission ended without filling the session (e.g. a restart in between):
+            # serve the report if one was cached since the session started
+            cached = await asyncio.to_thread(
+                report_cache.get, missions.make_key(topic, document_id), _hours_since(new_session.created_at)
+            )
+        try:
+            if cached is None:
+                flight = missions.start(topic, document_id, user_id=current_user.id if current_user else None, **options)
+            elif cached[2]:
+                # Stale-while-revalidate: serve now, refresh for the next request
+                missions.start(topic, document_id, priority="background", **options)
+        except QueueFull as e:
+            if cached is None:
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                                    headers={"Retry-After": str(e.retry_after)})
+
     async def event_generator():
+        nonlocal new_session
         if not orchestrator:
             yield f"data: {json.dumps({'type': 'error', 'msg': 'Orchestrator not initialized'})}\n\n"
             return
-            
-        new_session = None
-        if current_user:
+
+        if new_session and new_session.status == "completed":
+            # Finished while the client was away: just deliver the report
+            event = {"type": "complete", "content": new_session.ai_analysis}
+            yield f"id: {new_session.id}:done:0\ndata: {json.dumps(event)}\n\n"
+            return
+
+        if current_user and new_session is None:
             new_session = models.ResearchSession(
                 topic=topic,
                 query=topic,
@@ -144,20 +254,40 @@ async def stream_research(
             db.add(new_session)
             db.commit()
             db.refresh(new_session)
+        elif new_session:
+            new_session.status = "processing"
+            db.commit()
 
         start_time = time.time()
         final_report = None
+        session_id = new_session.id if new_session else 0
         try:
-            async for update in orchestrator.run_mission(topic):
-                yield f"data: {json.dumps(update)}\n\n"
-                if update.get("type") == "complete":
+            if cached:
+                report, age_seconds, _ = cached
+                flight_id, since = "cache", 0
+                updates = _replay_cached(report, age_seconds)
+            else:
+                # Same flight as before the disconnect: replay only what was missed.
+                # Otherwise (e.g. after a restart) the mission resumed from its
+                # checkpoints, so its whole stream is replayed.
+                flight_id = flight.mission_id
+                since = resume_index + 1 if resume_flight_id == flight_id else 0
+                # Each requester keeps its own session row; the coalescer fills it
+                # when the shared run ends, even if this client has gone away
+                updates = missions.subscribe(flight, new_session.id if new_session else None, since=since)
+
+            index = since
+            async for update in updates:
+                yield f"id: {session_id}:{flight_id}:{index}\ndata: {json.dumps(update)}\n\n"
+                index += 1
+                if update.get("type") == "complete" and not update.get("error"):
                     final_report = update.get("content")
                     
             end_time = time.time()
             elapsed_seconds = int(end_time - start_time)
             
-            if new_session:
-                new_session.status = "completed"
+            if new_session and cached:
+                new_session.status = "completed" if final_report is not None else "failed"
                 new_session.ai_analysis = final_report
                 new_session.time_taken = f"{elapsed_seconds}s"
                 # Mock papers count since we're generating the report here
@@ -172,6 +302,42 @@ async def stream_research(
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+def _parse_event_id(event_id: str):
+    """'12:flight-ab12:40' -> (12, 'flight-ab12', 40); anything else -> (None, None, -1)"""
+    try:
+        session_id, flight_id, index = (event_id or "").split(":")
+        return int(session_id) or None, flight_id, int(index)
+    except ValueError:
+        return None, None, -1
+
+def _hours_since(moment: datetime) -> float:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (datetime.utcnow() - moment).total_seconds() / 3600)
+
+async def _replay_cached(report: str, age_seconds: int):
+    yield {"agent": "Synthesis", "status": "active", "msg": f"Serving cached report ({age_seconds // 60} min old)..."}
+    yield {"type": "complete", "content": report, "cached": True, "age_seconds": age_seconds}
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats(current_user: models.User = Depends(get_current_user)):
+    stats = {}
+    if orchestrator:
+        stats["search"] = orchestrator.searcher.cache.stats()
+        if orchestrator.planner.plan_cache is not None:
+            stats["plans"] = orchestrator.planner.plan_cache.stats()
+        stats["missions"] = missions.stats()
+        stats["reports"] = report_cache.stats()
+        stats["scheduler"] = missions.scheduler.stats()
+        from agents.core.rate_limiter import limiter_stats
+        stats["rate_limits"] = limiter_stats()
+        stats["models"] = orchestrator.planner.llm.router.stats()
+        from agents.core.context_packer import packing_stats
+        stats["context"] = packing_stats()
+        if orchestrator.planner.llm.cache is not None:
+            stats["llm"] = await asyncio.to_thread(orchestrator.planner.llm.cache.stats)
+    return stats
+
 from pydantic import BaseModel
 class ChatRequest(BaseModel):
     message: str
@@ -182,12 +348,13 @@ async def chat_with_pilot(
     current_user: models.User = Depends(get_current_user)
 ):
     try:
-        from agents.core.llm_client import GroqClient
-        client = GroqClient()
-        response = await asyncio.to_thread(
-            client.generate, 
+        from agents.core.llm_client import get_gateway
+        response = await get_gateway().generate(
             request.message, 
-            "You are Pilot Assistant, an AI built into the ResearchPilot dashboard to help users understand their research reports or answer quick questions. Keep answers concise, and use markdown where helpful."
+            "You are Pilot Assistant, an AI built into the ResearchPilot dashboard to help users understand their research reports or answer quick questions. Keep answers concise, and use markdown where helpful.",
+            stage="chat",
+            # Chat replies are sampled; never serve a cached one
+            use_cache=False,
         )
         return {"response": response}
     except Exception as e:
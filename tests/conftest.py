@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# The agents refuse to start without API keys; the tests never reach either service
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+from agents.core import memory
+from app.database import Base
+
+
+class FakePlanner:
+    def __init__(self, plan=("a", "b", "c")):
+        self.plan = list(plan)
+        self.calls = 0
+
+    async def generate_plan(self, topic, file_context=""):
+        self.calls += 1
+        return list(self.plan)
+
+
+class FakeSearcher:
+    def __init__(self):
+        self.queries = []
+
+    def fetch_results(self, query, max_results=5, max_age=None):
+        self.queries.append(query)
+        return [{"url": f"http://example.com/{query}", "title": query, "content": f"Findings about {query}."}]
+
+    def format_results(self, results):
+        return "\n---\n".join(f"SOURCE: {r['url']}\nCONTENT: {r['content']}" for r in results)
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.queries = []
+        self.fail_on = set()
+
+    async def analyze_results(self, query, raw_data):
+        self.queries.append(query)
+        if query in self.fail_on:
+            raise RuntimeError("LLM unavailable")
+        return f"analysis of {query}"
+
+    async def analyze_results_stream(self, query, raw_data):
+        yield await self.analyze_results(query, raw_data)
+
+
+class FakeHypothesizer:
+    async def generate_hypotheses(self, topic, context):
+        return "hypotheses"
+
+
+class FakeSynthesizer:
+    async def synthesize(self, topic, analyses):
+        return " | ".join(analyses)
+
+    async def synthesize_stream(self, topic, analyses):
+        for i, text in enumerate(analyses):
+            yield (" | " if i else "") + text
+
+
+@pytest.fixture
+def db_session_factory():
+    """Session factory over a private in-memory SQLite database."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def orchestrator(monkeypatch, tmp_path):
+    """ResearchOrchestrator on the BM25-only memory, with fake agents."""
+    # Response cache and document index live under ./.cache
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(memory, "_HAS_FAISS", False)
+    from agents.core.orchestrator import ResearchOrchestrator
+    orch = ResearchOrchestrator()
+    orch.planner = FakePlanner()
+    orch.searcher = FakeSearcher()
+    orch.analyzer = FakeAnalyzer()
+    orch.hypothesizer = FakeHypothesizer()
+    orch.synthesizer = FakeSynthesizer()
+    return orch
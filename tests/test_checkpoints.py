@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.services.mission_checkpoints import CheckpointStore
+from app.services.mission_coalescer import MissionCoalescer
+
+
+def _run(missions, topic, **options):
+    async def collect():
+        return [update async for update in missions.run_mission(topic, **options)]
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def missions(orchestrator, db_session_factory):
+    return MissionCoalescer(orchestrator, checkpoints=CheckpointStore(db_session_factory),
+                            session_factory=db_session_factory)
+
+
+def _saved_stages(missions, topic):
+    return sorted(missions.checkpoints.for_mission(missions.make_key(topic)).load())
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_retried_mission_resumes_from_checkpoints(orchestrator, missions, concurrent):
+    orchestrator.analyzer.fail_on = {"c"}
+    failed = _run(missions, "quantum dots", concurrent=concurrent)
+
+    assert failed[-1] == {"type": "error", "msg": "LLM unavailable"}
+    assert _saved_stages(missions, "quantum dots") == ["plan", "query:0", "query:1"]
+
+    orchestrator.analyzer.fail_on = set()
+    orchestrator.analyzer.queries.clear()
+    orchestrator.searcher.queries.clear()
+    resumed = _run(missions, "quantum dots", concurrent=concurrent)
+
+    messages = [update.get("msg") for update in resumed]
+    assert "Resumed plan from checkpoint." in messages
+    assert "Resumed 2 of 3 sub-queries from checkpoint." in messages
+    assert orchestrator.planner.calls == 1
+    assert orchestrator.searcher.queries == ["c"]
+    assert orchestrator.analyzer.queries == ["c"]
+    assert resumed[-1] == {"type": "complete", "content": "analysis of a | analysis of b | analysis of c | hypotheses"}
+    # Cleared once the report is out
+    assert _saved_stages(missions, "quantum dots") == []
+
+
+def test_failed_stages_are_not_checkpointed(orchestrator, missions):
+    async def analysis_error(query, raw_data):
+        return "Error during analysis: rate limited" if query == "b" else f"analysis of {query}"
+
+    def search_error(query, max_results=5, max_age=None):
+        if query == "c":
+            raise RuntimeError("search unavailable")
+        return [{"url": f"http://example.com/{query}", "title": query, "content": f"Findings about {query}."}]
+
+    async def synthesis_error(topic, analyses):
+        yield "Error during synthesis: rate limited"
+
+    orchestrator.analyzer.analyze_results = analysis_error
+    orchestrator.searcher.fetch_results = search_error
+    # A failed synthesis keeps the checkpoints, so what was saved can be inspected
+    orchestrator.synthesizer.synthesize_stream = synthesis_error
+
+    updates = _run(missions, "quantum dots")
+
+    assert updates[-1]["error"] is True
+    assert _saved_stages(missions, "quantum dots") == ["hypotheses", "plan", "query:0"]
@@ -0,0 +1,46 @@
+from agents.core.chunking import chunk_search_results, chunk_stream, chunk_text
+from agents.core.near_dup import NearDuplicateFilter
+
+
+def _words(count, prefix="w"):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_chunk_text_windows_overlap():
+    chunks = chunk_text(_words(10), max_tokens=4, overlap=1)
+
+    assert chunks == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+
+
+def test_chunk_text_short_and_empty():
+    assert chunk_text("just a few words", max_tokens=10, overlap=2) == ["just a few words"]
+    assert chunk_text("", max_tokens=10, overlap=2) == []
+
+
+def test_chunk_stream_matches_joined_text():
+    pages = [_words(7, "a"), "", _words(9, "b"), _words(5, "c")]
+
+    assert list(chunk_stream(pages, max_tokens=6, overlap=2)) == chunk_text("\n".join(p for p in pages if p), 6, 2)
+
+
+def test_chunk_search_results_keeps_source():
+    results = [
+        {"url": "http://a", "title": "A", "content": _words(6)},
+        {"url": "http://b", "title": "B", "content": "short"},
+    ]
+
+    chunks = chunk_search_results(results, max_tokens=4, overlap=0)
+
+    assert [(c["source"], c["position"]) for c in chunks] == [("http://a", 0), ("http://a", 1), ("http://b", 0)]
+    assert chunks[1]["text"] == "w4 w5"
+
+
+def test_near_duplicates_are_detected():
+    dedup = NearDuplicateFilter()
+    paragraph = " ".join(f"word{i}" for i in range(100))
+
+    assert not dedup.is_duplicate(paragraph)
+    assert dedup.is_duplicate("  " + paragraph.upper())
+    assert dedup.is_duplicate(paragraph.rsplit(" ", 1)[0] + " changed")
+    assert not dedup.is_duplicate(" ".join(f"other{i}" for i in range(100)))
+    assert dedup.stats == {"exact": 1, "near": 1, "kept": 2}
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app import models
+from app.services.mission_coalescer import MissionCoalescer
+from app.services.report_cache import ReportCache
+
+
+@pytest.fixture
+def research_session(db_session_factory):
+    """Creates ResearchSession rows for one user; returns their ids."""
+    def create(count=1):
+        db = db_session_factory()
+        try:
+            user = models.User(email=f"user{count}@example.com", hashed_password="x")
+            db.add(user)
+            db.commit()
+            ids = []
+            for _ in range(count):
+                row = models.ResearchSession(topic="t", query="t", user_id=user.id, status="processing")
+                db.add(row)
+                db.commit()
+                ids.append(row.id)
+            return ids
+        finally:
+            db.close()
+    return create
+
+
+async def _collect(updates):
+    return [update async for update in updates]
+
+
+def test_identical_requests_join_one_mission(orchestrator, db_session_factory):
+    missions = MissionCoalescer(orchestrator, session_factory=db_session_factory)
+
+    async def run():
+        return await asyncio.gather(
+            _collect(missions.run_mission("Quantum Dots")),
+            _collect(missions.run_mission("  quantum dots ")),
+        )
+
+    first, second = asyncio.run(run())
+
+    assert orchestrator.planner.calls == 1
+    assert sorted(orchestrator.searcher.queries) == ["a", "b", "c"]
+    assert first == second
+    assert first[-1]["type"] == "complete"
+    assert missions.stats() == {"in_flight": 0, "started": 1, "joined": 1}
+
+
+def test_late_subscriber_gets_replay(orchestrator, db_session_factory):
+    missions = MissionCoalescer(orchestrator, session_factory=db_session_factory)
+
+    async def run():
+        flight = missions.start("quantum dots")
+        live = await _collect(missions.subscribe(flight))
+        # The flight has finished; subscribing now replays its whole history
+        replay = await _collect(missions.subscribe(flight))
+        return live, replay
+
+    live, replay = asyncio.run(run())
+
+    assert replay == live
+    assert live[-1] == {"type": "complete", "content": "analysis of a | analysis of b | analysis of c | hypotheses"}
+
+
+def test_subscribe_since_skips_seen_events(orchestrator, db_session_factory):
+    missions = MissionCoalescer(orchestrator, session_factory=db_session_factory)
+
+    async def run():
+        flight = missions.start("quantum dots")
+        full = await _collect(missions.subscribe(flight))
+        return full, await _collect(missions.subscribe(flight, since=4))
+
+    full, resumed = asyncio.run(run())
+
+    assert len(full) > 4
+    assert resumed == full[4:]
+
+
+def test_every_subscribed_session_is_filled(orchestrator, db_session_factory, research_session):
+    missions = MissionCoalescer(orchestrator, session_factory=db_session_factory)
+    left_early, stayed, arrived_late = research_session(3)
+
+    async def run():
+        flight = missions.start("quantum dots")
+
+        async def disconnect_after_first_event():
+            async for _ in missions.subscribe(flight, left_early):
+                break
+
+        await asyncio.gather(disconnect_after_first_event(), _collect(missions.subscribe(flight, stayed)))
+        await _collect(missions.subscribe(flight, arrived_late))
+
+    asyncio.run(run())
+
+    db = db_session_factory()
+    try:
+        sessions = db.query(models.ResearchSession).order_by(models.ResearchSession.id).all()
+        assert [s.status for s in sessions] == ["completed"] * 3
+        assert {s.ai_analysis for s in sessions} == {"analysis of a | analysis of b | analysis of c | hypotheses"}
+    finally:
+        db.close()
+
+
+def test_failed_synthesis_is_not_cached(orchestrator, db_session_factory, research_session):
+    async def failing_synthesis(topic, analyses):
+        yield "Error during synthesis: rate limited"
+
+    orchestrator.synthesizer.synthesize_stream = failing_synthesis
+    report_cache = ReportCache(db_session_factory)
+    missions = MissionCoalescer(orchestrator, report_cache, session_factory=db_session_factory)
+    (session_id,) = research_session(1)
+
+    updates = asyncio.run(_collect(missions.run_mission("quantum dots", session_id=session_id)))
+
+    assert updates[-1]["error"] is True
+    assert report_cache.get(missions.make_key("quantum dots"), 24) is None
+    db = db_session_factory()
+    try:
+        assert db.get(models.ResearchSession, session_id).status == "failed"
+    finally:
+        db.close()
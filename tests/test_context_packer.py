@@ -0,0 +1,61 @@
+import pytest
+
+from agents.core import context_packer
+from agents.core.context_packer import _allocate, count_tokens, pack, trim_to_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Length-based estimate (~4 characters per token), whether or not tiktoken is cached here
+    monkeypatch.setattr(context_packer, "_encoder", None)
+
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+
+
+def test_trim_keeps_whole_sentences():
+    text = "First sentence here. Second sentence here. Third one."
+
+    assert trim_to_tokens(text, 100) == text
+    assert trim_to_tokens(text, 11) == "First sentence here. Second sentence here."
+    assert trim_to_tokens(text, 6) == "First sentence here."
+    # No sentence fits: fall back to whole words
+    assert trim_to_tokens(text, 4) == "First sentence"
+    assert trim_to_tokens(text, 0) == ""
+
+
+def test_allocate_hands_unused_share_to_others():
+    assert _allocate([10, 100, 100], [1, 1, 1], 110) == [10, 50, 50]
+    assert _allocate([100, 100], [3, 1], 80) == [60, 20]
+    assert _allocate([0, 40], [1, 1], 100) == [0, 40]
+
+
+def test_pack_fits_budget_by_relevance():
+    sentence = "Measured results for the sample. "
+    sources = [
+        {"text": sentence * 40, "score": 3.0},
+        {"text": sentence * 40, "score": 1.0},
+        "Short note.",
+    ]
+
+    packed = pack(sources, "test_stage", budget=200, separator="\n\n")
+    parts = packed.split("\n\n")
+
+    assert count_tokens(packed) <= 200
+    assert parts[2] == "Short note."
+    assert count_tokens(parts[0]) > 2 * count_tokens(parts[1])
+    assert all(part.endswith(".") for part in parts)
+
+
+def test_pack_within_budget_is_unchanged_and_counted():
+    sources = ["alpha beta.", {"text": "gamma delta."}]
+
+    assert pack(sources, "test_unchanged", budget=1000, separator=" ") == "alpha beta. gamma delta."
+    stats = context_packer.packing_stats()["test_unchanged"]
+    assert stats["calls"] == 1
+    assert stats["trimmed"] == 0
+    assert stats["tokens_in"] == count_tokens("alpha beta.") + count_tokens("gamma delta.")
+    assert stats["tokens_out"] == count_tokens("alpha beta. gamma delta.")
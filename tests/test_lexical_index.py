@@ -0,0 +1,29 @@
+from agents.core.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_keeps_digits():
+    assert tokenize("The GT 650 uses H2O-cooling.") == ["the", "gt", "650", "uses", "h2o", "cooling"]
+
+
+def test_bm25_ranks_exact_terms_first():
+    index = BM25Index()
+    index.add(0, "Graphics cards from several vendors compared on price.")
+    index.add(1, "The GT 650 graphics card benchmark results.")
+    index.add(2, "A history of card games.")
+
+    results = index.search("gt 650", k=3)
+
+    assert [doc_id for _, doc_id in results] == [1]
+    assert index.search("graphics card", k=1)[0][1] == 1
+
+
+def test_bm25_remove_and_k():
+    index = BM25Index()
+    for doc_id in range(5):
+        index.add(doc_id, f"raman spectroscopy note {doc_id}")
+
+    assert len(index.search("raman", k=2)) == 2
+    index.remove(3)
+    assert len(index) == 4
+    assert 3 not in [doc_id for _, doc_id in index.search("raman", k=10)]
+    assert index.search("nothing matches", k=3) == []
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from agents.core.llm_client import LLMGateway
+from agents.core.model_router import ModelRouter
+
+_REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+_TIERS = {"large": "big-model", "small": "small-model"}
+
+
+def _status_error(cls, status):
+    return cls("error", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    gw = LLMGateway(api_key="test-key")
+    gw.router = ModelRouter(routes={"synthesis": "large"}, budgets={}, tiers=_TIERS)
+    return gw
+
+
+def _fail_on(gateway, monkeypatch, failures: dict):
+    """Makes _create raise failures[model]; other models answer with their name."""
+    calls = []
+
+    async def create(state, model, messages, estimated, **params):
+        calls.append(model)
+        if model in failures:
+            raise failures[model]
+        message = SimpleNamespace(content=f"reply from {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(gateway, "_create", create)
+    return calls
+
+
+def _recorded_models(gateway):
+    return set(gateway.router.stats()["stages"].get("synthesis", {}).get("models", {}))
+
+
+@pytest.mark.parametrize("error", [
+    _status_error(groq.BadRequestError, 400),
+    _status_error(groq.AuthenticationError, 401),
+])
+def test_client_errors_are_raised_without_fallback(gateway, monkeypatch, error):
+    calls = _fail_on(gateway, monkeypatch, {"big-model": error})
+
+    with pytest.raises(type(error)):
+        asyncio.run(gateway.generate("prompt", stage="synthesis"))
+
+    assert calls == ["big-model"]
+    # A bad request says nothing about the model's health
+    assert _recorded_models(gateway) == set()
+
+
+@pytest.mark.parametrize("error", [
+    _status_error(groq.InternalServerError, 503),
+    _status_error(groq.RateLimitError, 429),
+    groq.APITimeoutError(request=_REQUEST),
+])
+def test_transient_errors_fall_back_to_the_faster_tier(gateway, monkeypatch, error):
+    calls = _fail_on(gateway, monkeypatch, {"big-model": error})
+
+    assert asyncio.run(gateway.generate("prompt", stage="synthesis")) == "reply from small-model"
+    assert calls == ["big-model", "small-model"]
+    stats = gateway.router.stats()["stages"]["synthesis"]["models"]
+    assert stats["big-model"]["errors"] == 1
+    assert stats["small-model"]["errors"] == 0
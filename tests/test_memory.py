@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from agents.core import memory
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fuse = memory.AgentMemory._fuse
+    owner = SimpleNamespace(rrf_k=60)
+
+    # 2 is ranked by both sources; 1 and 3 tie and the later position wins
+    assert fuse(owner, [([0, 1, 2], 1.0), ([2, 3], 1.0)], 3) == [2, 0, 3]
+    # Weighting the second source puts its top hit first
+    assert fuse(owner, [([0, 1], 1.0), ([1, 0], 3.0)], 2) == [1, 0]
+
+
+def test_lexical_memory_skips_duplicates_and_keeps_metadata(monkeypatch):
+    monkeypatch.setattr(memory, "_HAS_FAISS", False)
+    store = memory.AgentMemory()
+    chunks = [
+        {"text": "Perovskite cells reached 26% efficiency.", "source": "http://a", "title": "A"},
+        {"text": "perovskite   cells reached 26% EFFICIENCY.", "source": "http://b", "title": "B"},
+        {"text": "Tandem silicon modules are entering production.", "source": "http://c", "title": "C"},
+    ]
+
+    assert store.add_chunks(chunks, "m1") == 2
+    hits = store.retrieve_relevant("perovskite efficiency", k=1, namespace="m1", with_metadata=True)
+    assert hits == [{"text": chunks[0]["text"], "source": "http://a", "title": "A"}]
+    # Namespaces never see each other's facts
+    assert store.retrieve_relevant("perovskite", namespace="m2") == []
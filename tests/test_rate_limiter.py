@@ -0,0 +1,33 @@
+import groq
+import httpx
+
+from agents.core.rate_limiter import was_rejected
+
+_REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def _raised(cause, wrapper=groq.APIConnectionError):
+    """The SDK exception as the client raises it, chained to the transport error."""
+    try:
+        try:
+            raise cause
+        except Exception as e:
+            raise wrapper(request=_REQUEST) from e
+    except Exception as e:
+        return e
+
+
+def _status_error(cls, status):
+    return cls("error", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+def test_rejected_requests_are_refundable():
+    assert was_rejected(_status_error(groq.RateLimitError, 429))
+    assert was_rejected(_raised(httpx.ConnectError("refused")))
+    assert was_rejected(_raised(httpx.ConnectTimeout("no route"), groq.APITimeoutError))
+
+
+def test_possibly_processed_requests_are_not_refundable():
+    assert not was_rejected(_raised(httpx.ReadTimeout("slow"), groq.APITimeoutError))
+    assert not was_rejected(_raised(httpx.RemoteProtocolError("dropped")))
+    assert not was_rejected(_status_error(groq.InternalServerError, 503))
@@ -0,0 +1,96 @@
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.core import memory
+from app import database
+from app.services.mission_coalescer import MissionCoalescer
+from app.services.mission_scheduler import MissionScheduler, QueueFull
+
+
+def _start_order(scheduler, first, tickets):
+    """Releases the running ticket repeatedly and records who starts next."""
+    labels = {id(ticket): label for label, ticket in tickets.items()}
+    order, running = [], first
+    while True:
+        scheduler.release(running)
+        started = [t for t in tickets.values() if t.started.is_set() and labels[id(t)] not in order]
+        if not started:
+            return order
+        running = started[0]
+        order.append(labels[id(running)])
+
+
+def test_users_take_turns():
+    scheduler = MissionScheduler(workers=1, per_user=5, weights={"interactive": 1})
+    blocker = scheduler.enqueue("z")
+    tickets = {}
+    for label in ("a1", "a2", "a3"):
+        tickets[label] = scheduler.enqueue("a")
+    tickets["b1"] = scheduler.enqueue("b")
+
+    assert _start_order(scheduler, blocker, tickets) == ["a1", "b1", "a2", "a3"]
+
+
+def test_priority_classes_share_by_weight():
+    scheduler = MissionScheduler(workers=1, per_user=5, weights={"interactive": 2, "background": 1})
+    blocker = scheduler.enqueue("z")
+    tickets = {}
+    for i in range(1, 5):
+        tickets[f"i{i}"] = scheduler.enqueue("interactive-user", "interactive")
+    for i in range(1, 3):
+        tickets[f"g{i}"] = scheduler.enqueue("background-user", "background")
+
+    assert _start_order(scheduler, blocker, tickets) == ["i1", "g1", "i2", "i3", "g2", "i4"]
+
+
+def test_per_user_cap_leaves_slots_for_others():
+    scheduler = MissionScheduler(workers=3, per_user=1)
+    a1 = scheduler.enqueue("a")
+    a2 = scheduler.enqueue("a")
+    b1 = scheduler.enqueue("b")
+
+    assert a1.started.is_set() and b1.started.is_set()
+    assert not a2.started.is_set()
+    assert scheduler.running == 2
+    assert scheduler.position(a2) == 1
+
+    scheduler.release(a1)
+    assert a2.started.is_set()
+
+
+def test_full_queue_raises_with_retry_after():
+    scheduler = MissionScheduler(workers=1, per_user=5, max_queue=2)
+    scheduler.enqueue("a")
+    scheduler.enqueue("a")
+    scheduler.enqueue("b")
+
+    with pytest.raises(QueueFull) as excinfo:
+        scheduler.enqueue("c")
+    # avg_duration (30s) * (2 waiting + 1) / 1 worker
+    assert excinfo.value.retry_after == 90
+    assert scheduler.stats()["rejected"] == 1
+    assert len(scheduler.waiting) == 2
+
+
+def test_research_returns_429_when_queue_is_full(monkeypatch, tmp_path, orchestrator):
+    # main creates its tables on import and its upload directory in the working directory
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    monkeypatch.setattr(memory, "_HAS_FAISS", False)
+    sys.modules.pop("main", None)
+    import main
+
+    full = MissionScheduler(workers=1, max_queue=0)
+    monkeypatch.setattr(main, "orchestrator", orchestrator)
+    monkeypatch.setattr(main, "missions", MissionCoalescer(orchestrator, scheduler=full))
+
+    response = TestClient(main.app).get("/research", params={"topic": "quantum dots"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(full.retry_after())
+    assert "queue is full" in response.json()["detail"]